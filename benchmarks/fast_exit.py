@@ -0,0 +1,62 @@
+"""Measures the interpreter teardown time saved by ``run(fast_exit=True)``.
+
+Each measurement starts a new interpreter that allocates ``objects``
+dictionaries, keeps them alive in a module global and returns from the
+command. The time reported covers the whole process, so the difference
+between the two modes is the time spent tearing down the heap.
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+from clize import run
+
+
+def command(*, objects:int=1000000):
+    global kept
+    kept = [{'index': i, 'name': str(i)} for i in range(objects)]
+
+
+def child(objects, fast_exit):
+    run(command, args=['command', '--objects', str(objects)],
+        fast_exit=fast_exit)
+
+
+def measure(objects, fast_exit, repeat):
+    args = [sys.executable, __file__, '--child', '--objects', str(objects)]
+    if fast_exit:
+        args.append('--fast-exit')
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(args, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(*, objects:int=1000000, repeat:int=5,
+         fast_exit=False, child_=False):
+    """Compares process run times with and without fast_exit
+
+    :param objects: Number of objects the command leaves allocated.
+    :param repeat: Number of runs for each mode. The median is shown.
+    :param fast_exit: Internal: used with --child.
+    :param child_: Internal: run the command rather than the benchmark.
+    """
+    if child_:
+        return child(objects, fast_exit)
+    normal = measure(objects, False, repeat)
+    fast = measure(objects, True, repeat)
+    return (
+        'objects: {0}\n'
+        'sys.exit():    {1:.3f}s\n'
+        'fast_exit:     {2:.3f}s\n'
+        'saved:         {3:.3f}s ({4:.0%})'
+        .format(objects, normal, fast, normal - fast,
+                (normal - fast) / normal))
+
+
+if __name__ == '__main__':
+    run(main)
@@ -0,0 +1,115 @@
+"""Measures the latency of running a command of a 500-command application
+directly and through `clize.serve`.
+
+The application is written to a temporary directory as ``app.py``. Each
+command is run:
+
+- with ``python -m app``, which starts an interpreter and builds the CLI
+  every time,
+- with ``python -m clize_client``, which still starts an interpreter for the
+  client but lets a pre-warmed server fork a child to run the command,
+- by calling `clize_client.connect` from this process, as a long-running job
+  runner would.
+"""
+
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import clize_client
+from clize import run
+
+
+APP = '''
+import sys
+from clize import run
+from clize.serve import serve
+
+
+def make_command(i):
+    def command(path, *values: int, count: int=1, verbose=False,
+                name='default', ratio: float=0.5):
+        """Does something with path
+
+        :param path: The file to work with.
+        :param values: Numbers to process.
+        :param count: How many times to do it.
+        :param verbose: Show more output.
+        :param name: A name for the result.
+        :param ratio: How much of it to do.
+        """
+        return i
+    command.__name__ = 'command_{0}'.format(i)
+    return command
+
+
+commands = [make_command(i) for i in range({commands})]
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--serve']:
+        serve(sys.argv[2], commands, name='app')
+    else:
+        run(commands)
+'''
+
+
+def median_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def wait_for(path, server):
+    deadline = time.monotonic() + 60
+    while not os.path.exists(path):
+        if time.monotonic() > deadline or server.poll() is not None:
+            raise RuntimeError('The server did not start')
+        time.sleep(0.01)
+
+
+def main(*, commands:int=500, repeat:int=20):
+    """Compares the latency of python -m app with clize.serve
+
+    :param commands: Number of commands in the application.
+    :param repeat: Number of runs for each case. The median is shown.
+    """
+    args = ['command-1', 'file', '1', '2', '--count=3']
+    root = str(pathlib.Path(__file__).resolve().parents[1])
+    with tempfile.TemporaryDirectory() as tmp, \
+            open(os.devnull, 'wb') as devnull:
+        with open(os.path.join(tmp, 'app.py'), 'w') as f:
+            f.write(APP.replace('{commands}', str(commands)))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([tmp, root]))
+        sock = os.path.join(tmp, 'app.sock')
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'app', '--serve', sock], env=env, cwd=tmp)
+        try:
+            wait_for(sock, server)
+            direct = median_time(lambda: subprocess.run(
+                [sys.executable, '-m', 'app'] + args, env=env, cwd=tmp,
+                stdout=devnull, check=True), repeat)
+            client = median_time(lambda: subprocess.run(
+                [sys.executable, '-m', 'clize_client', sock] + args, env=env,
+                cwd=tmp, stdout=devnull, check=True), repeat)
+            connected = median_time(lambda: clize_client.connect(
+                sock, args, stdout=devnull.fileno()), repeat)
+        finally:
+            server.terminate()
+            server.wait()
+    return '\n'.join([
+        'commands: {0}'.format(commands),
+        'python -m app: {0:.1f}ms'.format(direct * 1000),
+        'python -m clize_client: {0:.1f}ms'.format(client * 1000),
+        'clize_client.connect: {0:.1f}ms'.format(connected * 1000),
+    ])
+
+
+if __name__ == '__main__':
+    run(main)
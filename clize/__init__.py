@@ -5,12 +5,12 @@
 """procedurally generate command-line interfaces from callables"""
 
 from clize.parser import Parameter
-from clize.runner import Clize, SubcommandDispatcher, run
+from clize.runner import Clize, SubcommandDispatcher, run, run_batch
 from clize.legacy import clize, make_flag
 from clize.errors import UserError, ArgumentError
 
 __all__ = [
-    'run', 'Parameter', 'UserError',
+    'run', 'run_batch', 'Parameter', 'UserError',
     'Clize', 'ArgumentError', 'SubcommandDispatcher',
     'clize', 'make_flag'
 ]
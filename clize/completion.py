@@ -0,0 +1,391 @@
+# clize -- A command-line argument parser for Python
+# Copyright (C) 2011-2022 by Yann Kaiser and contributors. See AUTHORS and
+# COPYING for details.
+
+"""
+`clize.completion` writes shell completion scripts for a CLI.
+
+The scripts contain the subcommands, options and `.parameters.mapped`
+values read from the CLI's `.parser.CliSignature` objects, so completing a
+command line does not start Python. Run ``python -m clize.completion
+module:object`` to print the script for a CLI object, or use
+`completion_script`.
+"""
+
+import importlib
+import re
+
+from clize import runner, parser, parameters, errors
+
+
+_plain_word = re.compile(r'^[^\s\'"\\`$]+$')
+
+
+def _words(names):
+    return ' '.join(name for name in names if _plain_word.match(name))
+
+
+def completion_data(cli):
+    """Returns the data a completion script needs about ``cli``, as a dict
+    that maps lookup keys to space-separated candidates:
+
+    ``'c|CTX'``
+        The subcommands available after the subcommands ``CTX``.
+    ``'o|CTX'``
+        The options of the command reached with ``CTX``.
+    ``'v|CTX|OPTION'``
+        The values of ``OPTION``, or an empty string if it takes any value.
+    ``'p|CTX|N'``
+        The values of the ``N``-th positional parameter, if it is mapped.
+    ``'P|CTX'``
+        The index of the ``*args`` parameter followed by its values, if it
+        is mapped.
+    ``'s'``
+        The pipeline separator, if there is one.
+
+    ``CTX`` is empty for the top-level command. Values that contain
+    whitespace, quotes, backslashes or dollar signs are left out.
+
+    :param cli: The object returned by `.Clize.get_cli`.
+    """
+    data = {}
+    owner = getattr(cli, 'owner', None)
+    if isinstance(owner, runner.SubcommandDispatcher) \
+            and owner.pipeline_separator:
+        data['s'] = owner.pipeline_separator
+    _add_context(data, cli, '', set())
+    return data
+
+
+def _add_context(data, cli, ctx, seen):
+    if not isinstance(cli, runner.Clize) or (ctx, cli) in seen:
+        return
+    seen.add((ctx, cli))
+    sig = cli.signature
+    data['o|' + ctx] = _words(sorted(sig.aliases))
+    for alias, param in sig.aliases.items():
+        if parser.takes_value(param):
+            data['v|{0}|{1}'.format(ctx, alias)] = _words(
+                param.value_choices())
+    owner = cli.owner
+    if isinstance(owner, runner.SubcommandDispatcher):
+        data['c|' + ctx] = _words(owner.cmds_by_name)
+        for name, command in owner.cmds_by_name.items():
+            _add_context(data, command, (ctx + ' ' + name).strip(), seen)
+        return
+    for i, param in enumerate(sig.positional):
+        values = ''
+        if parser.takes_value(param):
+            values = _words(param.value_choices())
+        if isinstance(param, parser.ExtraPosArgsParameter):
+            if values:
+                data['P|' + ctx] = '{0} {1}'.format(i, values)
+            break
+        if values:
+            data['p|{0}|{1}'.format(ctx, i)] = values
+
+
+def _sh_quote(s):
+    return "'" + s.replace("'", "'\\''") + "'"
+
+
+def _fish_quote(s):
+    return "'" + s.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def _bash_entries(data):
+    return '\n'.join(
+        '    [{0}]={1}'.format(_sh_quote(key), _sh_quote(value))
+        for key, value in sorted(data.items()))
+
+
+def _zsh_entries(data):
+    return '\n'.join(
+        '    {0} {1}'.format(_sh_quote(key), _sh_quote(value))
+        for key, value in sorted(data.items()))
+
+
+_BASH = '''\
+# bash completion for {name}, generated by clize.completion
+
+declare -gA {func}_table=(
+{cases}
+)
+
+{func}_data() {{
+    [[ -n "${{{func}_table[$1]+set}}" ]] || return 1
+    REPLY="${{{func}_table[$1]}}"
+}}
+
+{func}() {{
+    local line="${{COMP_LINE:0:COMP_POINT}}" cur= ctx= opt= word REPLY
+    local -i pos=0 ended=0 i n
+    local -a words
+    read -ra words <<< "$line"
+    if [[ "$line" != *[[:space:]] ]]; then
+        cur="${{words[-1]}}"
+        unset 'words[-1]'
+    fi
+    n=${{#words[@]}}
+    for (( i = 1; i < n; i++ )); do
+        word="${{words[i]}}"
+        if (( ended )); then
+            (( pos += 1 ))
+        elif {func}_data s && [[ "$word" == "$REPLY" ]]; then
+            ctx= pos=0
+        elif (( pos == 0 )) && {func}_data "c|$ctx" \\
+                && {func}_data "o|${{ctx:+$ctx }}$word"; then
+            ctx="${{ctx:+$ctx }}$word"
+        elif [[ "$word" == -- ]]; then
+            ended=1
+        elif {func}_data "v|$ctx|$word"; then
+            if (( i == n - 1 )); then opt="$word"; else (( i += 1 )); fi
+        elif [[ "$word" != -* ]]; then
+            (( pos += 1 ))
+        fi
+    done
+    local candidates= value
+    if [[ -n "$opt" ]]; then
+        {func}_data "v|$ctx|$opt"
+        candidates="$REPLY"
+    elif (( ! ended )) && [[ "$cur" == --*=* ]]; then
+        if {func}_data "v|$ctx|${{cur%%=*}}"; then
+            for value in $REPLY; do
+                candidates+=" ${{cur%%=*}}=$value"
+            done
+        fi
+    elif (( ! ended )) && [[ "$cur" == -* ]]; then
+        {func}_data "o|$ctx" && candidates="$REPLY"
+    elif (( pos == 0 )) && {func}_data "c|$ctx"; then
+        candidates="$REPLY"
+    elif {func}_data "p|$ctx|$pos"; then
+        candidates="$REPLY"
+    elif {func}_data "P|$ctx" && (( pos >= ${{REPLY%% *}} )); then
+        candidates="${{REPLY#* }}"
+    fi
+    if [[ -z "$candidates" ]]; then
+        COMPREPLY=( $(compgen -f -- "$cur") )
+        return
+    fi
+    local prefix="${{cur%"${{cur##*[=:]}}"}}"
+    COMPREPLY=()
+    for value in $(compgen -W "$candidates" -- "$cur"); do
+        COMPREPLY+=( "${{value#"$prefix"}}" )
+    done
+}}
+
+complete -o filenames -F {func} {name}
+'''
+
+
+_ZSH = '''\
+#compdef {name}
+# zsh completion for {name}, generated by clize.completion
+
+typeset -gA {func}_table
+{func}_table=(
+{cases}
+)
+
+{func}_data() {{
+    (( ${{+{func}_table[$1]}} )) || return 1
+    REPLY="${{{func}_table[$1]}}"
+}}
+
+{func}() {{
+    local cur="${{words[CURRENT]}}" ctx= opt= word REPLY candidates= value
+    integer pos=0 ended=0 i
+    for (( i = 2; i < CURRENT; i++ )); do
+        word="${{words[i]}}"
+        if (( ended )); then
+            (( pos += 1 ))
+        elif {func}_data s && [[ "$word" == "$REPLY" ]]; then
+            ctx= pos=0
+        elif (( pos == 0 )) && {func}_data "c|$ctx" \\
+                && {func}_data "o|${{ctx:+$ctx }}$word"; then
+            ctx="${{ctx:+$ctx }}$word"
+        elif [[ "$word" == -- ]]; then
+            ended=1
+        elif {func}_data "v|$ctx|$word"; then
+            if (( i == CURRENT - 1 )); then opt="$word"; else (( i += 1 )); fi
+        elif [[ "$word" != -* ]]; then
+            (( pos += 1 ))
+        fi
+    done
+    if [[ -n "$opt" ]]; then
+        {func}_data "v|$ctx|$opt"
+        candidates="$REPLY"
+    elif (( ! ended )) && [[ "$cur" == --*=* ]]; then
+        if {func}_data "v|$ctx|${{cur%%=*}}" && [[ -n "$REPLY" ]]; then
+            compset -P '*='
+            compadd -- ${{=REPLY}}
+            return
+        fi
+        _files
+        return
+    elif (( ! ended )) && [[ "$cur" == -* ]]; then
+        {func}_data "o|$ctx" && candidates="$REPLY"
+    elif (( pos == 0 )) && {func}_data "c|$ctx"; then
+        candidates="$REPLY"
+    elif {func}_data "p|$ctx|$pos"; then
+        candidates="$REPLY"
+    elif {func}_data "P|$ctx" && (( pos >= ${{REPLY%% *}} )); then
+        candidates="${{REPLY#* }}"
+    fi
+    if [[ -z "$candidates" ]]; then
+        _files
+        return
+    fi
+    compadd -- ${{=candidates}}
+}}
+
+compdef {func} {name}
+'''
+
+
+_FISH = '''\
+# fish completion for {name}, generated by clize.completion
+
+function {func}_data
+    switch $argv[1]
+{cases}
+        case '*'
+            return 1
+    end
+end
+
+function {func}
+    set -l tokens (commandline -opc)
+    set -l cur (commandline -ct)
+    set -l sep (string split ' ' -- ({func}_data s))
+    set -l ctx ''
+    set -l opt ''
+    set -l pos 0
+    set -l ended 0
+    set -l n (count $tokens)
+    set -l i 2
+    while test $i -le $n
+        set -l word $tokens[$i]
+        if test $ended -eq 1
+            set pos (math $pos + 1)
+        else if test -n "$sep"; and test "$word" = "$sep"
+            set ctx ''
+            set pos 0
+        else if test $pos -eq 0; and contains -- $word (string split ' ' -- ({func}_data "c|$ctx"))
+            set ctx (string trim -- "$ctx $word")
+        else if test "$word" = --
+            set ended 1
+        else if {func}_data "v|$ctx|$word" >/dev/null
+            if test $i -eq $n
+                set opt $word
+            else
+                set i (math $i + 1)
+            end
+        else if not string match -q -- '-*' $word
+            set pos (math $pos + 1)
+        end
+        set i (math $i + 1)
+    end
+    set -l candidates
+    set -l prefix ''
+    set -l args
+    if test -n "$opt"
+        set candidates (string split ' ' -- ({func}_data "v|$ctx|$opt"))
+    else if test $ended -eq 0; and string match -q -- '--*=*' $cur
+        set prefix (string split -m 1 = -- $cur)[1]=
+        set candidates (string split ' ' -- ({func}_data "v|$ctx|"(string trim -r -c = -- $prefix)))
+    else if test $ended -eq 0; and string match -q -- '-*' $cur
+        set candidates (string split ' ' -- ({func}_data "o|$ctx"))
+    else if test $pos -eq 0; and {func}_data "c|$ctx" >/dev/null
+        set candidates (string split ' ' -- ({func}_data "c|$ctx"))
+    else if {func}_data "p|$ctx|$pos" >/dev/null
+        set candidates (string split ' ' -- ({func}_data "p|$ctx|$pos"))
+    else if set args (string split ' ' -- ({func}_data "P|$ctx")); and test $pos -ge $args[1]
+        set candidates $args[2..-1]
+    end
+    set candidates (string match -v '' -- $candidates)
+    if test (count $candidates) -eq 0
+        __fish_complete_path $cur
+        return
+    end
+    printf '%s\\n' $prefix$candidates
+end
+
+complete -c {name} -f -a '({func})'
+'''
+
+
+def _fish_cases(data):
+    return '\n'.join(
+        '        case {0}\n            echo {1}'.format(
+            _fish_quote(key), _fish_quote(value))
+        for key, value in sorted(data.items()))
+
+
+shells = {
+    'bash': (_BASH, _bash_entries),
+    'zsh': (_ZSH, _zsh_entries),
+    'fish': (_FISH, _fish_cases),
+}
+"""The shells `completion_script` can write scripts for."""
+
+
+_program_name = re.compile(r'[\w.+-]+\Z', re.ASCII)
+
+
+def completion_script(cli, name, shell='bash'):
+    """Returns a completion script for ``cli`` in the language of
+    ``shell``.
+
+    :param cli: The object returned by `.Clize.get_cli`.
+    :param str name: The name users type to run the program. It may only
+        contain ASCII letters, digits, and the ``_``, ``.``, ``+`` and ``-``
+        characters, as it is written into the script unquoted.
+    :param str shell: ``'bash'``, ``'zsh'`` or ``'fish'``.
+    :raises ValueError: if ``shell`` or ``name`` is not supported.
+    """
+    try:
+        template, cases = shells[shell]
+    except KeyError:
+        raise ValueError('Unknown shell: {0!r}'.format(shell))
+    if not _program_name.match(name):
+        raise ValueError('Unsupported program name: {0!r}'.format(name))
+    func = '_clize_' + re.sub(r'\W', '_', name)
+    return template.format(
+        name=name, func=func, cases=cases(completion_data(cli)))
+
+
+def _load(target):
+    module_name, colon, attribute = target.partition(':')
+    if not colon or not attribute:
+        raise errors.ArgumentError(
+            'Expected module:object, got {0!r}'.format(target))
+    obj = importlib.import_module(module_name)
+    for part in attribute.split('.'):
+        obj = getattr(obj, part)
+    return module_name, obj
+
+
+_shell_names = parameters.one_of(*shells)
+
+
+def main(target, *, shell: _shell_names='bash', name=''):
+    """Prints a shell completion script
+
+    :param target: The CLI object to complete, as ``module:object``. It is
+        passed to `.Clize.get_cli`, like `.run` does.
+    :param shell: The shell to write the script for.
+    :param name: The name users type to run the program. Defaults to the
+        last part of the module name.
+    """
+    module_name, obj = _load(target)
+    cli = runner.Clize.get_cli(obj)
+    try:
+        return completion_script(
+            cli, name or module_name.rpartition('.')[2], shell)
+    except ValueError as exc:
+        raise errors.ArgumentError(str(exc))
+
+
+if __name__ == '__main__':
+    runner.run(main)
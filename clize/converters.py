@@ -1,10 +1,15 @@
 # clize -- A command-line argument parser for Python
 # Copyright (C) 2011-2022 by Yann Kaiser and contributors. See AUTHORS and
 # COPYING for details.
+import collections
 import contextlib
+import errno
 import sys
 import io
+import mmap
 import os
+import stat
+import tempfile
 import warnings
 from functools import partial
 
@@ -24,26 +29,162 @@ def datetime(arg):
     return dparser.parse(arg)
 
 
+_SPOOL_MAX_SIZE = 1 << 20
+_COPY_SIZE = 1 << 16
+
+
+def _map_file(f):
+    if not os.fstat(f.fileno()).st_size:
+        return memoryview(b'')
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _spool(source, max_size=_SPOOL_MAX_SIZE):
+    buf = io.BytesIO()
+    while buf.tell() <= max_size:
+        chunk = source.read(_COPY_SIZE)
+        if not chunk:
+            return memoryview(buf.getvalue())
+        buf.write(chunk)
+    with tempfile.TemporaryFile() as f:
+        f.write(buf.getbuffer())
+        del buf
+        while True:
+            chunk = source.read(_COPY_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+        f.flush()
+        return _map_file(f)
+
+
+_compression_modules = {'gzip': 'gzip', 'bz2': 'bz2', 'xz': 'lzma'}
+_compression_suffixes = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+_compression_magic = {
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bz2',
+    b'\xfd7zXZ\x00': 'xz',
+}
+_compression_open_kwargs = ('encoding', 'errors', 'newline')
+
+
+def _check_compression(compression):
+    if compression not in (None, 'auto') \
+            and compression not in _compression_modules:
+        raise ValueError('Unknown compression: {0!r}'.format(compression))
+
+
+def _detect_compression(head):
+    for magic, compression in _compression_magic.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def _compressed_open(compression, target, mode, kwargs):
+    import importlib
+    module = importlib.import_module(_compression_modules[compression])
+    if 'b' not in mode:
+        mode += 't'
+    return module.open(
+        target, mode,
+        **{k: kwargs[k] for k in _compression_open_kwargs if k in kwargs})
+
+
+def _advise(f, sequential, readahead):
+    advise = getattr(os, 'posix_fadvise', None)
+    if advise is None or not (sequential or readahead):
+        return
+    try:
+        fd = f.fileno()
+        if sequential:
+            advise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        if readahead:
+            advise(fd, 0, readahead, os.POSIX_FADV_WILLNEED)
+    except (OSError, AttributeError, ValueError):
+        pass
+
+
+def _advise_mapped(data, sequential, readahead):
+    madvise = getattr(data, 'madvise', None)
+    if madvise is None:
+        return
+    try:
+        if sequential and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            madvise(mmap.MADV_SEQUENTIAL)
+        if readahead and hasattr(mmap, 'MADV_WILLNEED'):
+            madvise(mmap.MADV_WILLNEED, 0, min(readahead, len(data)))
+    except OSError:
+        pass
+
+
+_ATOMIC_BUFFER_SIZE = 1 << 20
+
+
+def _create_temp(dirname, basename):
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    for _ in range(100):
+        path = os.path.join(dirname, '.{0}.{1}.tmp'.format(
+            basename, os.urandom(4).hex()))
+        try:
+            return os.open(path, flags, 0o666), path
+        except FileExistsError:
+            continue
+    raise FileExistsError(
+        errno.EEXIST, 'No usable temporary file name found')
+
+
+def _fsync_directory(dirname):
+    try:
+        fd = os.open(dirname or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
 class _FileOpener(object):
-    def __init__(self, arg, kwargs, stdio, keep_stdio_open):
+    def __init__(self, arg, kwargs, stdio, keep_stdio_open, mmap=False,
+                 compression=None, sequential=False, readahead=None,
+                 atomic=False, validate=True):
         self.arg = arg
         self.kwargs = kwargs
         self.stdio = stdio
         self.keep_stdio_open = keep_stdio_open
-        self.validate_permissions()
+        self.mmap = mmap
+        self.compression = compression
+        self.sequential = sequential
+        self.readahead = readahead
+        self.atomic = atomic
+        if validate:
+            self.validate_permissions()
+
+    def validate_permissions(self, exists=None, dir_writable=None):
+        """Checks that the file can be opened.
 
-    def validate_permissions(self):
+        :param exists: Used instead of `os.access` to check if the file
+            exists.
+        :param dir_writable: Used instead of `os.access` to check if the
+            file's directory is writable.
+        """
         mode = self.kwargs.get('mode', 'r')
         if self.arg == self.stdio:
             return
-        exists = os.access(self.arg, os.F_OK)
-        if not exists:
+        if exists is None:
+            exists = partial(os.access, mode=os.F_OK)
+        if dir_writable is None:
+            dir_writable = partial(os.access, mode=os.W_OK)
+        if not exists(self.arg):
             if 'r' in mode and '+' not in mode:
                 raise errors.CliValueError(
                     'File does not exist: {0!r}'.format(self.arg))
             else:
                 dirname = os.path.dirname(self.arg)
-                if not dirname or os.access(dirname, os.W_OK):
+                if not dirname or dir_writable(dirname):
                     return
                 if not os.path.exists(dirname):
                     raise errors.CliValueError(
@@ -54,19 +195,205 @@ class _FileOpener(object):
             'Permission denied: {0!r}'.format(self.arg))
 
     def __enter__(self):
+        if self.mmap:
+            return self._enter_mapped()
+        mode = self.kwargs.get('mode', 'r')
         if self.arg == self.stdio:
-            mode = self.kwargs.get('mode', 'r')
-            self.f = sys.stdin if 'r' in mode else sys.stdout
+            self.stream = sys.stdin if 'r' in mode else sys.stdout
+            compression = self.get_compression(self.stream, mode)
+            if compression is None:
+                if 'b' in mode and hasattr(self.stream, 'buffer'):
+                    self.stream.flush()
+                    self.f = self.stream.buffer
+                else:
+                    self.f = self.stream
+            else:
+                self.stream.flush()
+                self.f = _compressed_open(
+                    compression, self.stream.buffer, mode, self.kwargs)
+        elif self.atomic:
+            self._enter_atomic(mode)
         else:
             try:
-                self.f = io.open(self.arg, **self.kwargs)
+                compression = self.get_compression(self.arg, mode)
+                if compression is None:
+                    self.f = io.open(self.arg, **self.kwargs)
+                else:
+                    self.f = _compressed_open(
+                        compression, self.arg, mode, self.kwargs)
             except IOError as exc:
                 raise _convert_ioerror(self.arg, exc)
+        _advise(self.f, self.sequential, self.readahead)
         return self.f
 
+    def get_compression(self, target, mode):
+        """Returns which compression format to use for ``target``, a path or
+        the standard stream, or `None`"""
+        if self.compression != 'auto':
+            return self.compression
+        if isinstance(target, str):
+            suffix = os.path.splitext(target)[1].lower()
+            if suffix in _compression_suffixes:
+                return _compression_suffixes[suffix]
+            if 'r' not in mode or '+' in mode:
+                return None
+            with io.open(target, 'rb') as f:
+                return _detect_compression(f.read(8))
+        peek = getattr(getattr(target, 'buffer', None), 'peek', None)
+        if 'r' not in mode or peek is None:
+            return None
+        return _detect_compression(peek(8))
+
+    def _enter_atomic(self, mode):
+        dirname, basename = os.path.split(self.arg)
+        try:
+            fd, self.temp_path = _create_temp(dirname, basename)
+        except IOError as exc:
+            raise _convert_ioerror(self.arg, exc)
+        try:
+            try:
+                os.chmod(self.temp_path,
+                         stat.S_IMODE(os.stat(self.arg).st_mode))
+            except FileNotFoundError:
+                pass
+            kwargs = dict(self.kwargs)
+            kwargs.setdefault('buffering', _ATOMIC_BUFFER_SIZE)
+            compression = self.get_compression(self.arg, mode)
+            if compression is None:
+                self.raw = self.f = io.open(fd, **kwargs)
+            else:
+                self.raw = io.open(fd, 'wb', buffering=kwargs['buffering'])
+                self.f = _compressed_open(
+                    compression, self.raw, mode, self.kwargs)
+        except BaseException:
+            os.close(fd)
+            os.unlink(self.temp_path)
+            raise
+
+    def _exit_atomic(self, exc_type):
+        try:
+            if exc_type is None:
+                if self.f is not self.raw:
+                    self.f.close()
+                self.raw.flush()
+                os.fsync(self.raw.fileno())
+                self.raw.close()
+                os.replace(self.temp_path, self.arg)
+                _fsync_directory(os.path.dirname(self.arg))
+                return
+        except BaseException:
+            self._discard_atomic()
+            raise
+        self._discard_atomic()
+
+    def _discard_atomic(self):
+        for f in (self.f, self.raw):
+            try:
+                f.close()
+            except Exception:
+                pass
+        try:
+            os.unlink(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+    def _enter_mapped(self):
+        if self.arg == self.stdio:
+            self.stream = sys.stdin
+            self.data = _spool(getattr(self.stream, 'buffer', self.stream))
+        else:
+            try:
+                with io.open(self.arg, 'rb') as f:
+                    if stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+                        self.data = _map_file(f)
+                    else:
+                        self.data = _spool(f)
+            except IOError as exc:
+                raise _convert_ioerror(self.arg, exc)
+        _advise_mapped(self.data, self.sequential, self.readahead)
+        return self.data
+
     def __exit__(self, *exc_info):
-        if self.arg != self.stdio or not self.keep_stdio_open:
+        if self.mmap:
+            if isinstance(self.data, memoryview):
+                self.data.release()
+            else:
+                self.data.close()
+        elif self.arg != self.stdio and self.atomic:
+            self._exit_atomic(exc_info[0])
+        elif self.arg != self.stdio:
             self.f.close()
+        elif self.f is not self.stream \
+                and self.f is not getattr(self.stream, 'buffer', None):
+            self.f.close()
+        if self.arg == self.stdio:
+            if not self.keep_stdio_open:
+                self.stream.close()
+            elif self.f is not self.stream:
+                self.stream.flush()
+
+
+_SCANDIR_THRESHOLD = 16
+
+
+class _DirectoryListings(object):
+    """Answers existence checks for the files in directories that contain
+    many of the checked files with one `os.scandir` per directory.
+    Other files, names that aren't listed and symbolic links are checked
+    with `os.access`."""
+
+    def __init__(self, paths):
+        counts = collections.Counter(os.path.dirname(p) for p in paths)
+        self.listings = {
+            dirname: None
+            for dirname, count in counts.items()
+            if count >= _SCANDIR_THRESHOLD}
+        self.writable = {}
+
+    def listing(self, dirname):
+        listing = self.listings[dirname]
+        if listing is None:
+            try:
+                with os.scandir(dirname or '.') as it:
+                    listing = {
+                        entry.name: entry.is_symlink() for entry in it}
+            except OSError:
+                listing = {}
+            self.listings[dirname] = listing
+        return listing
+
+    def exists(self, path):
+        dirname, basename = os.path.split(path)
+        if dirname in self.listings:
+            is_symlink = self.listing(dirname).get(basename)
+            if is_symlink is False:
+                return True
+        return os.access(path, os.F_OK)
+
+    def dir_writable(self, dirname):
+        try:
+            return self.writable[dirname]
+        except KeyError:
+            ret = self.writable[dirname] = os.access(dirname, os.W_OK)
+            return ret
+
+
+def _validate_batch(openers):
+    listings = _DirectoryListings(
+        [o.arg for o in openers if o.arg != o.stdio])
+    for opener in openers:
+        try:
+            opener.validate_permissions(
+                listings.exists, listings.dir_writable)
+        except errors.CliValueError as exc:
+            yield exc
+        else:
+            yield opener
+
+
+def _open_batch(args, **kwargs):
+    return list(_validate_batch(
+        [_FileOpener(arg, validate=False, **kwargs) for arg in args]))
 
 
 @contextlib.contextmanager
@@ -83,7 +410,9 @@ def _conversion_filter(arg):
 with _silence_convert_default_warning():
     @parser.value_converter(name='FILE', convert_default=True, convert_default_filter=_conversion_filter)
     @autokwoargs(exceptions=['arg'])
-    def file(arg=util.UNSET, stdio='-', keep_stdio_open=False, **kwargs):
+    def file(arg=util.UNSET, stdio='-', keep_stdio_open=False, mmap=False,
+             compression=None, sequential=False, readahead=None,
+             atomic=False, batch=False, **kwargs):
         """Takes a file argument and provides a Python object that opens a file
 
         ::
@@ -94,8 +423,44 @@ with _silence_convert_default_warning():
 
         :param stdio: If this value is passed as argument, it will be interpreted
             as *stdin* or *stdout* depending on the ``mode`` parameter supplied.
+            In binary modes, their underlying binary buffers are used.
         :param keep_stdio_open: If true, does not close the file if it is *stdin*
             or *stdout*.
+        :param mmap: If true, the context manager provides a read-only
+            `mmap.mmap` of the file's contents instead of a file object, which
+            can be sliced without copying. *stdin* and files that cannot be
+            mapped, such as pipes, are read into a `memoryview` instead, or
+            into a temporary file once they exceed 1MiB. Empty files also
+            result in an empty `memoryview`. Slices taken from the mapping
+            must be released before leaving the ``with`` block.
+        :param compression: Compress or decompress the file on the fly.
+            One of ``'gzip'``, ``'bz2'`` or ``'xz'``, or ``'auto'`` to pick
+            one from the file name's suffix (``.gz``, ``.bz2``, ``.xz``), or
+            when reading, from the first bytes of the file or *stdin*.
+            Files that don't appear to be compressed are opened as usual.
+            Only ``encoding``, ``errors`` and ``newline`` are relayed when the
+            file is compressed.
+        :param sequential: If true, tell the operating system that the file
+            will be read sequentially, so it can read ahead more aggressively.
+        :param readahead: Ask the operating system to start reading this many
+            bytes from the start of the file in the background.
+
+        These hints use `os.posix_fadvise`, or `mmap.mmap.madvise` when
+        ``mmap`` is set, and are ignored where they are not available.
+        Use ``buffering`` to set the size of the buffer used by `io.open`.
+
+        :param atomic: In ``'w'`` modes, write to a temporary file next to the
+            target, with a 1MiB buffer unless ``buffering`` is given. When the
+            ``with`` block completes, the temporary file is synced to disk and
+            renamed over the target, so that the target is never left
+            partially written. If the block raises an exception, the
+            temporary file is removed and the target is left untouched.
+
+        :param batch: If true, the files are checked together once all
+            arguments are read instead of one at a time, which is faster
+            when many files from the same directories are passed. Whether
+            the files exist then comes from a single listing of each
+            directory that holds at least 16 of them.
 
         Other arguments will be relayed to `io.open`.
 
@@ -112,16 +477,103 @@ with _silence_convert_default_warning():
 
 
         """
+        if mmap and set(kwargs.get('mode', 'r')) - set('rb'):
+            raise ValueError('mmap=True requires a read-only mode')
+        if mmap and compression:
+            raise ValueError('mmap=True cannot be used with compression')
+        mode = kwargs.get('mode', 'r')
+        if atomic and ('w' not in mode or '+' in mode):
+            raise ValueError("atomic=True requires a 'w' mode")
+        _check_compression(compression)
+        opener_kwargs = dict(
+            kwargs=kwargs, stdio=stdio, keep_stdio_open=keep_stdio_open,
+            mmap=mmap, compression=compression,
+            sequential=sequential, readahead=readahead, atomic=atomic)
         if arg is not util.UNSET:
-            return _FileOpener(arg, kwargs, stdio, keep_stdio_open)
+            return _FileOpener(arg, **opener_kwargs)
         with _silence_convert_default_warning():
             return parser.value_converter(
-                partial(_FileOpener, kwargs=kwargs,
-                        stdio=stdio, keep_stdio_open=keep_stdio_open),
-                name='FILE', convert_default=True, convert_default_filter=_conversion_filter)
+                partial(_FileOpener, **opener_kwargs),
+                name='FILE', convert_default=True, convert_default_filter=_conversion_filter,
+                batch=partial(_open_batch, **opener_kwargs) if batch else None)
 
 
 def _convert_ioerror(arg, exc):
     nexc = errors.ArgumentError('{0.strerror}: {1!r}'.format(exc, arg))
     nexc.__cause__ = exc
     return nexc
+
+
+class _Prefetcher(object):
+    def __init__(self, openers, ahead):
+        self.openers = iter(openers)
+        self.ahead = ahead
+
+    def __enter__(self):
+        from concurrent.futures import ThreadPoolExecutor
+        self.executor = ThreadPoolExecutor(1)
+        self.pending = collections.deque()
+        self.current = None
+        self.iterator = self._iterate()
+        return self.iterator
+
+    def _fill(self):
+        while len(self.pending) < self.ahead:
+            try:
+                opener = next(self.openers)
+            except StopIteration:
+                return
+            self.pending.append(
+                (opener, self.executor.submit(opener.__enter__)))
+
+    def _iterate(self):
+        self._fill()
+        while self.pending:
+            opener, future = self.pending.popleft()
+            f = future.result()
+            self.current = opener
+            self._fill()
+            yield f
+            self.current = None
+            opener.__exit__(None, None, None)
+
+    def __exit__(self, *exc_info):
+        self.iterator.close()
+        try:
+            if self.current is not None:
+                self.current.__exit__(*exc_info)
+        finally:
+            for opener, future in self.pending:
+                if future.cancel():
+                    continue
+                try:
+                    future.result()
+                except Exception:
+                    continue
+                opener.__exit__(None, None, None)
+            self.executor.shutdown()
+
+
+def prefetch(openers, ahead=2):
+    """Opens the files from an iterable of `file` values one after another,
+    opening the next ones in a background thread while the current one is
+    being used.
+
+    ::
+
+        def cat(*inputs: file(mode='rb')):
+            with prefetch(inputs) as files:
+                for f in files:
+                    sys.stdout.buffer.write(f.read())
+
+    Each file is closed as soon as the iteration moves on to the next one.
+    Files that are still open when the ``with`` block ends, including ones
+    that were prefetched but not reached, are closed then.
+
+    :param openers: Context managers that provide files, such as the values
+        produced by `file`.
+    :param int ahead: How many files to open ahead of the current one.
+    """
+    if ahead < 1:
+        raise ValueError('ahead must be at least 1')
+    return _Prefetcher(openers, ahead)
@@ -146,6 +146,16 @@ class ArgsBeforeAlternateCommand(ArgumentError):
             self.param.display_name)
 
 
+class MultipleErrors(UserError):
+    """Raised when several calls made for a single command failed."""
+
+    def __init__(self, errors):
+        self.errors = errors
+
+    def __str__(self):
+        return '\n'.join(str(exc) for exc in self.errors)
+
+
 class SetErrorContext(object):
     """Context manager that sets attributes on exceptions that are raised
     past it"""
@@ -2,7 +2,10 @@
 # Copyright (C) 2011-2022 by Yann Kaiser and contributors. See AUTHORS and
 # COPYING for details.
 
+import contextvars
 import inspect
+import os
+import sys
 from functools import update_wrapper
 
 from sigtools import modifiers, specifiers, signatures
@@ -82,6 +85,10 @@ class MappedParameter(parser.ParameterWithValue):
             ba.sticky = parser.IgnoreAllArguments()
             ba.posarg_only = True
 
+    def value_choices(self):
+        """Returns the names of the accepted values."""
+        return [name for _, names, _ in self.values for name in names]
+
     def show_list(self, name):
         f = util.Formatter()
         f.append('{name}: Possible values for {self.display_name}:'
@@ -195,6 +202,107 @@ def multi(min=0, max=None):
         }, name="multi")
 
 
+class _ReadStdinOption(parser.NamedParameter):
+    def __init__(self, parent, **kwargs):
+        super(_ReadStdinOption, self).__init__(**kwargs)
+        self.parent = parent
+        self.description = 'Read values for {0} from the standard input.' \
+            .format(parent.display_name)
+
+    def read_argument(self, ba, i):
+        self.parent.read_from_stdin(ba)
+
+
+class ArgsFromStdinParameter(parser.ExtraPosArgsParameter):
+    """``*args``-like parameter that can read further values from the
+    standard input."""
+
+    def __init__(self, sep, stdio, option, **kwargs):
+        super(ArgsFromStdinParameter, self).__init__(**kwargs)
+        self.sep = sep
+        self.stdio = stdio
+        if option:
+            self.extras = [_ReadStdinOption(parent=self, aliases=[option])]
+
+    def read_from_stdin(self, ba):
+        """Marks this parameter as taking values from the standard input."""
+        ba.meta[self] = True
+
+    def read_argument(self, ba, i):
+        """Starts reading from the standard input if the argument is
+        `.stdio`."""
+        if self.stdio is not None and ba.in_args[i] == self.stdio:
+            self.read_from_stdin(ba)
+        else:
+            super(ArgsFromStdinParameter, self).read_argument(ba, i)
+
+    def unsatisfied(self, ba):
+        """Considers values read from the standard input as satisfying the
+        parameter."""
+        if ba.meta.get(self):
+            return False
+        return super(ArgsFromStdinParameter, self).unsatisfied(ba)
+
+    def post_parse(self, ba):
+        super(ArgsFromStdinParameter, self).post_parse(ba)
+        if ba.meta.get(self):
+            ba.lazy_args = self.iter_stdin(ba)
+
+    def iter_stdin(self, ba):
+        """Reads and converts values from the standard input as they are
+        requested."""
+        stdin = getattr(sys.stdin, 'buffer', None)
+        if stdin is not None:
+            values = map(os.fsdecode,
+                         util.split_stream(stdin.read1, os.fsencode(self.sep)))
+        else:
+            values = util.split_stream(sys.stdin.read, self.sep)
+        with errors.SetArgumentErrorContext(param=self, ba=ba):
+            for value in values:
+                yield self.coerce_value(value, ba)
+
+    def help_parens(self):
+        """Mentions how to read values from the standard input."""
+        for s in super(ArgsFromStdinParameter, self).help_parens():
+            yield s
+        if self.stdio is not None:
+            yield 'use "{0}" to read values from the standard input'.format(
+                self.stdio)
+
+
+def from_stdin(*, sep='\n', stdio='-', option='--args-from-stdin'):
+    """For ``*args``-like parameters, lets the user supply further values
+    through the standard input.
+
+    Python passes ``*args`` to the function as a tuple, so all the values are
+    read and converted before the function is called. To process long
+    inputs as they arrive, set ``chunk_size`` on `.Clize`: the function is
+    then called once for every ``chunk_size`` values, and each chunk is
+    only read from the standard input when the previous call returns.
+
+    :param str sep: The separator between values. Use ``'\\0'`` to read the
+        output of ``find -print0``.
+    :param str stdio: When this value is passed as argument, values are read
+        from the standard input. `None` disables this.
+    :param str option: A named parameter that also triggers reading from the
+        standard input. `None` disables this.
+
+    .. literalinclude:: /../examples/from_stdin.py
+        :lines: 4-11
+
+    .. code-block:: console
+
+        $ find . -name '*.py' -print0 | python examples/from_stdin.py -
+    """
+    return parser.use_class(
+        varargs=ArgsFromStdinParameter,
+        kwargs={
+            'sep': sep,
+            'stdio': stdio,
+            'option': option,
+        }, name="from_stdin")
+
+
 class _ComposedProperty(object):
     def __init__(self, name):
         self.name = name
@@ -477,3 +585,18 @@ def pass_name(ba):
     """
     return ba.name
 
+
+_pipeline_value = contextvars.ContextVar('_pipeline_value', default=None)
+
+
+@value_inserter
+def pipeline_input(ba):
+    """Parameters decorated with this will receive the return value of the
+    previous command in a pipeline, or ``None`` for the first command or
+    outside of a pipeline.
+
+    Pipelines are enabled with `.SubcommandDispatcher`'s
+    ``pipeline_separator`` parameter.
+    """
+    return _pipeline_value.get()
+
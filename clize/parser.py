@@ -6,9 +6,12 @@
 interpret function signatures and read commandline arguments
 """
 
+import contextlib
+import io
 import itertools
 import inspect
 import os
+import sys
 import typing
 from functools import partial, wraps
 import pathlib
@@ -232,7 +235,7 @@ class HelperParameter(Parameter):
             display_name='<internal>', **kwargs)
 
 
-def value_converter(func=None, *, name=None, convert_default=None, convert_default_filter=lambda s: True):
+def value_converter(func=None, *, name=None, convert_default=None, convert_default_filter=lambda s: True, batch=None):
     """Callables decorated with this can be used as a value converter.
 
     :param str name: Use this name to designate the parameter value type.
@@ -266,6 +269,20 @@ def value_converter(func=None, *, name=None, convert_default=None, convert_defau
 
             Avoid ``convert_default`` completely.
 
+    :param function batch: If set, it is called with the list of all the
+        values to convert with this converter once all arguments are read,
+        instead of calling the converter for each value. It must return a
+        list of the converted values, or of the exceptions to raise for
+        values that could not be converted. This is useful when values
+        can be validated more efficiently together. Errors are still
+        reported before those of the arguments that follow. Parameters whose
+        class overrides how values are read, converted or stored call the
+        converter for each value instead.
+
+    Value converters may be coroutine functions. The coroutines they return
+    are awaited together once all arguments have been read, so that
+    conversions involving I/O run concurrently.
+
     See :ref:`value converter`.
     """
     if convert_default is not None:
@@ -278,6 +295,7 @@ def value_converter(func=None, *, name=None, convert_default=None, convert_defau
             'name': util.name_type2cli(func) if name is None else name,
             'convert_default': convert_default,
             'convert_default_filter': convert_default_filter,
+            'batch': batch,
         }
         try:
             func._clize__value_converter = info
@@ -337,6 +355,55 @@ def get_value_converter(annotation):
     raise ValueError('{0!r} is not a value converter'.format(annotation))
 
 
+@contextlib.contextmanager
+def _conversion_errors(arg):
+    try:
+        yield
+    except errors.CliValueError as e:
+        exc = errors.BadArgumentFormat(e)
+        exc.__cause__ = e
+        raise exc
+    except ValueError as e:
+        exc = errors.BadArgumentFormat(repr(arg))
+        exc.__cause__ = e
+        raise exc
+
+
+class _Conversion(object):
+    __slots__ = ('arg', 'coro')
+
+    def __init__(self, arg, coro):
+        self.arg = arg
+        self.coro = coro
+
+    def __await__(self):
+        with _conversion_errors(self.arg):
+            return (yield from self.coro.__await__())
+
+    def close(self):
+        self.coro.close()
+
+
+async def _await(awaitable):
+    return await awaitable
+
+
+def _run_in_new_loop(coro_factory):
+    import asyncio
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro_factory())
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(1) as executor:
+        return executor.submit(
+            lambda: asyncio.run(coro_factory())).result()
+
+
+def _run_awaitable(awaitable):
+    return _run_in_new_loop(partial(_await, awaitable))
+
+
 class ParameterWithValue(Parameter):
     """A parameter that takes a value from the arguments, with possible
     default and/or conversion.
@@ -383,25 +450,54 @@ class ParameterWithValue(Parameter):
         """Coerces ``arg`` using the `.conv` function. Raises
         `.errors.BadArgumentFormat` if the coercion function raises
         `ValueError`.
+
+        If the coercion function returns a coroutine, it is handed to
+        `CliBoundArguments.defer` so that it runs alongside the other
+        asynchronous conversions once all arguments have been read.
+
+        If `CliBoundArguments.conversion_workers` is set, synchronous
+        coercion functions are deferred to a thread pool using
+        `CliBoundArguments.defer_call`.
+
+        Coercion functions that provide a ``batch`` function (see
+        `value_converter`) are deferred with
+        `CliBoundArguments.defer_batch`, unless this parameter's class
+        overrides how values are read or stored, in which case it could
+        receive the placeholder instead of the value.
         """
-        try:
+        batch = getattr(self.conv, '_clize__value_converter', {}).get('batch')
+        if batch is not None and _stores_placeholders(self):
+            try:
+                defer_batch = ba.defer_batch
+            except AttributeError:
+                pass
+            else:
+                return defer_batch(self, batch, arg)
+        if (self.conv is not identity
+                and getattr(ba, 'conversion_workers', None)
+                and not inspect.iscoroutinefunction(self.conv)):
+            return ba.defer_call(self, partial(_convert, self.conv, arg))
+        with _conversion_errors(arg):
             ret = self.conv(arg)
-        except errors.CliValueError as e:
-            exc = errors.BadArgumentFormat(e)
-            exc.__cause__ = e
-            raise exc
-        except ValueError as e:
-            exc = errors.BadArgumentFormat(repr(arg))
-            exc.__cause__ = e
-            raise exc
-        else:
-            return ret
+        if inspect.iscoroutine(ret):
+            awaitable = _Conversion(arg, ret)
+            try:
+                defer = ba.defer
+            except AttributeError:
+                return _run_awaitable(awaitable)
+            return defer(self, awaitable)
+        return ret
 
     def get_value(self, ba, i):
         """Retrieves the "value" part of the argument in ``ba`` at
         position ``i``."""
         return ba.in_args[i]
 
+    def value_choices(self):
+        """Returns the values the user can enter for this parameter, for
+        completion, or an empty list if they aren't known in advance."""
+        return []
+
     def help_parens(self):
         """Shows the default value in the parameter description."""
         if self.cli_default is not util.UNSET:
@@ -759,6 +855,30 @@ class AppendArguments(HelperParameter, MultiParameter):
         return ba.args
 
 
+_placeholder_methods = {
+    'read_argument': {
+        ParameterWithValue.read_argument, OptionParameter.read_argument,
+        MultiParameter.read_argument},
+    'set_value': {
+        PositionalParameter.set_value, OptionParameter.set_value,
+        MultiParameter.set_value},
+    'coerce_value': {ParameterWithValue.coerce_value},
+}
+
+
+def _stores_placeholders(param):
+    cls = type(param)
+    return all(getattr(cls, name) in methods
+               for name, methods in _placeholder_methods.items())
+
+
+def takes_value(param):
+    """Returns whether ``param`` reads a value from the command line, as
+    opposed to a flag or a parameter that doesn't read arguments at all."""
+    return isinstance(param, ParameterWithValue) \
+        and not isinstance(param, FlagParameter)
+
+
 class IgnoreAllArguments(HelperParameter, Parameter):
     """Helper parameter for `.FallbackCommandParameter` that ignores the
     remaining arguments."""
@@ -1190,14 +1310,18 @@ class CliSignature(object):
                 )
                 return result
 
-    def read_arguments(self, args, name):
+    def read_arguments(self, args, name, conversion_workers=None):
         """Returns a `.CliBoundArguments` instance for this CLI signature
         bound to the given arguments.
 
         :param sequence args: The CLI arguments, minus the script name.
         :param str name: The script name.
+        :param int conversion_workers: If set, run value conversions in a
+            pool of this many threads. See
+            `CliBoundArguments.conversion_workers`.
         """
-        ba = CliBoundArguments(self, args, name)
+        ba = CliBoundArguments(
+            self, args, name, conversion_workers=conversion_workers)
         ba.process_arguments()
         return ba
 
@@ -1209,6 +1333,79 @@ class CliSignature(object):
             )
 
 
+_response_file_separators = {
+    'lines': b'\n',
+    'nul': b'\0',
+}
+
+
+def _check_response_file_format(format):
+    if format != 'shell' and format not in _response_file_separators:
+        raise ValueError(
+            'Unknown response file format: {0!r}'.format(format))
+
+
+def _iter_response_file(path, format):
+    if format == 'shell':
+        import shlex
+        with io.open(path, encoding=sys.getfilesystemencoding(),
+                     errors=sys.getfilesystemencodeerrors()) as f:
+            lexer = shlex.shlex(f, posix=True)
+            lexer.whitespace_split = True
+            lexer.commenters = ''
+            yield from lexer
+        return
+    sep = _response_file_separators[format]
+    with io.open(path, 'rb') as f:
+        for token in util.split_stream(f.read, sep):
+            if sep == b'\n' and token.endswith(b'\r'):
+                token = token[:-1]
+            yield os.fsdecode(token)
+
+
+def read_response_file(path, format='lines'):
+    """Reads the arguments stored in a response file.
+
+    :param str path: The path of the file to read.
+    :param str format: ``'lines'`` for one argument per line, ``'nul'`` for
+        NUL-separated arguments such as those produced by ``find -print0``,
+        or ``'shell'`` for whitespace-separated arguments with shell-like
+        quoting.
+    :raises: `.ArgumentError` if the file cannot be read.
+
+    The arguments are produced as the file is read, a chunk at a time.
+    """
+    _check_response_file_format(format)
+    try:
+        yield from _iter_response_file(path, format)
+    except IOError as exc:
+        nexc = errors.ArgumentError('{0.strerror}: {1!r}'.format(exc, path))
+        nexc.__cause__ = exc
+        raise nexc
+    except ValueError as exc:
+        nexc = errors.ArgumentError(
+            'Could not read response file {0!r}: {1}'.format(path, exc))
+        nexc.__cause__ = exc
+        raise nexc
+
+
+def expand_response_files(args, format='lines', prefix='@'):
+    """Replaces arguments of the form ``@path`` with the arguments read from
+    ``path`` using `read_response_file`.
+
+    Arguments read from response files are not expanded further.
+
+    `.CliBoundArguments` stores its arguments in a tuple, since parameters
+    may look at any of them, so every argument is held in memory once they
+    are passed to `CliSignature.read_arguments`.
+    """
+    for arg in args:
+        if len(arg) > len(prefix) and arg.startswith(prefix):
+            yield from read_response_file(arg[len(prefix):], format)
+        else:
+            yield arg
+
+
 class _SeekFallbackCommand(object):
     """Context manager that tries to seek a fallback command if an error was
     raised."""
@@ -1236,6 +1433,101 @@ class _SeekFallbackCommand(object):
                 return True
 
 
+class _DeferredValue(object):
+    __slots__ = ('param', 'awaitable', 'call', 'batch', 'arg')
+
+    def __init__(self, param, awaitable=None, call=None, batch=None,
+                 arg=None):
+        self.param = param
+        self.awaitable = awaitable
+        self.call = call
+        self.batch = batch
+        self.arg = arg
+
+    def __repr__(self):
+        return '<deferred value for {0}>'.format(self.param)
+
+    def discard(self):
+        close = getattr(self.awaitable, 'close', None)
+        if close is not None:
+            close()
+
+
+async def _gather(deferred, executor):
+    import asyncio
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(
+        *(value.awaitable if value.call is None
+          else loop.run_in_executor(executor, value.call)
+          for value in deferred),
+        return_exceptions=True)
+
+
+def _batch_result(arg, result):
+    if not isinstance(result, Exception):
+        return result
+    try:
+        with _conversion_errors(arg):
+            raise result
+    except Exception as exc:
+        return exc
+
+
+def _run_batches(deferred):
+    batches = {}
+    for value in deferred:
+        batches.setdefault(value.batch, []).append(value)
+    for batch, values in batches.items():
+        try:
+            results = batch([value.arg for value in values])
+        except Exception as exc:
+            results = [exc] * len(values)
+        for value, result in zip(values, results):
+            yield value, _batch_result(value.arg, result)
+
+
+def _run_concurrently(deferred, workers):
+    executor = None
+    if any(value.call is not None for value in deferred):
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(workers)
+    try:
+        if any(value.call is None for value in deferred):
+            return _run_in_new_loop(partial(_gather, deferred, executor))
+        futures = [executor.submit(value.call) for value in deferred]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as exc:
+                results.append(exc)
+        return results
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def _run_deferred(deferred, workers):
+    batched = [value for value in deferred if value.batch is not None]
+    others = [value for value in deferred if value.batch is None]
+    results = {id(value): result for value, result in _run_batches(batched)}
+    if others:
+        results.update(
+            (id(value), result) for value, result
+            in zip(others, _run_concurrently(others, workers)))
+    return [results[id(value)] for value in deferred]
+
+
+def _convert(conv, arg):
+    with _conversion_errors(arg):
+        return conv(arg)
+
+
+def _substitute_deferred(values, resolved):
+    return [resolved[id(v)] if isinstance(v, _DeferredValue) else v
+            for v in values]
+
+
 @attr.s
 class CliBoundArguments(object):
     """Command line arguments bound to a `.CliSignature` instance.
@@ -1283,6 +1575,20 @@ class CliBoundArguments(object):
         List of words to append to the script name when passed to the target
         function.
 
+    .. attribute:: lazy_args
+        :annotation: = None
+
+        If not `None`, an iterable of further positional arguments to pass
+        to the target function after `.args`. It is only consumed when the
+        target function is called.
+
+    .. attribute:: conversion_workers
+        :annotation: = None
+
+        If not `None`, value conversions are deferred with `.defer_call` and
+        run concurrently in a pool of this many threads before the
+        parameters' ``post_parse`` methods are called.
+
     The following attributes only exist while arguments are being processed:
 
     .. attribute:: posparam
@@ -1326,6 +1632,11 @@ class CliBoundArguments(object):
 
        Amount of arguments to skip.
 
+    .. attribute:: deferred
+       :annotation: = []
+
+       Conversions registered through `.defer` that have yet to complete.
+
     """
 
     threshold = 0.75
@@ -1342,6 +1653,8 @@ class CliBoundArguments(object):
     args = attr.ib(default=attr.Factory(list))
     kwargs = attr.ib(default=attr.Factory(dict))
     meta = attr.ib(default=attr.Factory(dict))
+    lazy_args = attr.ib(default=None)
+    conversion_workers = attr.ib(default=None)
 
     posparam = attr.ib(init=False)
     namedparams = attr.ib(init=False)
@@ -1349,6 +1662,7 @@ class CliBoundArguments(object):
     not_provided = attr.ib(init=False)
     posarg_only = attr.ib(init=False)
     skip = attr.ib(init=False)
+    deferred = attr.ib(init=False)
 
     def process_arguments(self):
         """Process the arguments in `.in_args`, setting the `.func`,
@@ -1364,54 +1678,168 @@ class CliBoundArguments(object):
         self.sticky = None
         self.posarg_only = False
         self.skip = 0
+        self.deferred = []
 
-        with _SeekFallbackCommand():
-            for i, arg in enumerate(self.in_args):
-                if self.skip > 0:
-                    self.skip -= 1
-                    continue
-                with errors.SetArgumentErrorContext(pos=i, val=arg, ba=self):
-                    if self.posarg_only or len(arg) < 2 or arg[0] != '-':
-                        if self.sticky is not None:
-                            param = self.sticky
-                        else:
-                            try:
-                                param = next(self.posparam)
-                            except StopIteration:
-                                exc = errors.TooManyArguments(
-                                    self.in_args[i:])
-                                exc.__cause__ = None
-                                raise exc
-                    elif arg == '--':
-                        self.posarg_only = True
+        try:
+            with _SeekFallbackCommand():
+                for i, arg in enumerate(self.in_args):
+                    if self.skip > 0:
+                        self.skip -= 1
                         continue
-                    else:
-                        if arg.startswith('--'):
-                            name = arg.partition('=')[0]
+                    with errors.SetArgumentErrorContext(pos=i, val=arg, ba=self):
+                        if self.posarg_only or len(arg) < 2 or arg[0] != '-':
+                            if self.sticky is not None:
+                                param = self.sticky
+                            else:
+                                try:
+                                    param = next(self.posparam)
+                                except StopIteration:
+                                    exc = errors.TooManyArguments(
+                                        self.in_args[i:])
+                                    exc.__cause__ = None
+                                    raise exc
+                        elif arg == '--':
+                            self.posarg_only = True
+                            continue
                         else:
-                            name = arg[:2]
-                        try:
-                            param = self.namedparams[name]
-                        except KeyError:
-                            raise errors.UnknownOption(name)
-                    with errors.SetArgumentErrorContext(param=param):
-                        param.read_argument(self, i)
-                        param.apply_generic_flags(self)
-
-        if not self.func:
-            if self.unsatisfied:
-                unsatisfied = []
-                for p in self.unsatisfied:
-                    with errors.SetArgumentErrorContext(param=p):
-                        if p.unsatisfied(self):
-                            unsatisfied.append(p)
-                if unsatisfied:
-                    raise errors.MissingRequiredArguments(unsatisfied)
-
-            for p in self.sig.parameters.values():
-                p.post_parse(self)
-
-        del self.sticky, self.posarg_only, self.skip, self.unsatisfied, self.not_provided
+                            if arg.startswith('--'):
+                                name = arg.partition('=')[0]
+                            else:
+                                name = arg[:2]
+                            try:
+                                param = self.namedparams[name]
+                            except KeyError:
+                                raise errors.UnknownOption(name)
+                        with errors.SetArgumentErrorContext(param=param):
+                            param.read_argument(self, i)
+                            param.apply_generic_flags(self)
+
+            if not self.func:
+                if self.unsatisfied:
+                    unsatisfied = []
+                    for p in self.unsatisfied:
+                        with errors.SetArgumentErrorContext(param=p):
+                            if p.unsatisfied(self):
+                                unsatisfied.append(p)
+                    if unsatisfied:
+                        raise errors.MissingRequiredArguments(unsatisfied)
+
+                if self.deferred:
+                    self.resolve_deferred()
+
+                for p in self.sig.parameters.values():
+                    p.post_parse(self)
+
+                if self.deferred:
+                    self.resolve_deferred()
+        except errors.ArgumentError:
+            self._raise_batch_errors()
+            raise
+        finally:
+            for value in self.deferred:
+                value.discard()
+
+        del (self.sticky, self.posarg_only, self.skip, self.unsatisfied,
+             self.not_provided, self.deferred)
+
+    def defer(self, param, awaitable):
+        """Schedules ``awaitable`` to be awaited once all arguments have been
+        read, concurrently with the other deferred conversions.
+
+        Returns a placeholder to store in `.args` or `.kwargs` (or in a list
+        stored there) in place of the value. Placeholders are replaced with
+        the awaited values before the target function is called. If
+        ``awaitable`` raises an exception, it is reported as coming from
+        ``param``.
+
+        If arguments are no longer being processed, ``awaitable`` is run
+        immediately and its value is returned instead."""
+        try:
+            deferred = self.deferred
+        except AttributeError:
+            return _run_awaitable(awaitable)
+        value = _DeferredValue(param, awaitable)
+        deferred.append(value)
+        return value
+
+    def defer_call(self, param, func):
+        """Schedules ``func`` to be called without arguments in a thread
+        pool of `.conversion_workers` threads once all arguments have been
+        read.
+
+        Like `.defer`, returns a placeholder for the value, or the result of
+        ``func()`` if arguments are no longer being processed."""
+        try:
+            deferred = self.deferred
+        except AttributeError:
+            return func()
+        value = _DeferredValue(param, call=func)
+        deferred.append(value)
+        return value
+
+    def defer_batch(self, param, batch, arg):
+        """Schedules ``arg`` to be converted by calling ``batch`` once all
+        arguments have been read. ``batch`` is called once with the list of
+        all arguments deferred with it, and must return a list of the
+        converted values, or of exception instances for the arguments that
+        could not be converted.
+
+        Like `.defer`, returns a placeholder for the value, or the converted
+        value if arguments are no longer being processed."""
+        try:
+            deferred = self.deferred
+        except AttributeError:
+            result = _batch_result(arg, batch([arg])[0])
+            if isinstance(result, Exception):
+                raise result
+            return result
+        value = _DeferredValue(param, batch=batch, arg=arg)
+        deferred.append(value)
+        return value
+
+    def _raise_batch_errors(self):
+        # Values deferred with defer_batch were read before the argument
+        # that failed: report their errors first, as if they had been
+        # converted as they were read.
+        batched = [value for value in self.deferred if value.batch is not None]
+        if not batched:
+            return
+        results = {id(value): result
+                   for value, result in _run_batches(batched)}
+        for value in batched:
+            result = results[id(value)]
+            if isinstance(result, BaseException):
+                with errors.SetArgumentErrorContext(param=value.param, ba=self):
+                    raise result
+
+    def resolve_deferred(self):
+        """Runs the conversions registered with `.defer`, `.defer_call` and
+        `.defer_batch` and substitutes their results in `.args` and
+        `.kwargs`.
+
+        Batches run first. Then coroutines are awaited in a single event
+        loop while calls run in a thread pool. The event loop is created for
+        this purpose and closed afterwards. If an event loop is already
+        running in the current thread, it is run in a separate thread."""
+        deferred = self.deferred
+        self.deferred = []
+        try:
+            results = _run_deferred(deferred, self.conversion_workers)
+        finally:
+            for value in deferred:
+                value.discard()
+        for value, result in zip(deferred, results):
+            if isinstance(result, BaseException):
+                with errors.SetArgumentErrorContext(param=value.param, ba=self):
+                    raise result
+        resolved = {id(value): result
+                    for value, result in zip(deferred, results)}
+        self.args[:] = _substitute_deferred(self.args, resolved)
+        for key, val in self.kwargs.items():
+            if isinstance(val, list):
+                val[:] = _substitute_deferred(val, resolved)
+            elif isinstance(val, _DeferredValue):
+                self.kwargs[key] = resolved[id(val)]
 
     def get_best_guess(self, passed_in_arg):
         return util.closest_option(passed_in_arg, list(self.sig.aliases))
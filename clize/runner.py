@@ -1,7 +1,10 @@
 # clize -- A command-line argument parser for Python
 # Copyright (C) 2011-2022 by Yann Kaiser and contributors. See AUTHORS and
 # COPYING for details.
+import collections.abc
 import contextlib
+import inspect
+import io
 import pathlib
 import sys
 import os
@@ -33,7 +36,7 @@ class _CliWrapper(object):
             obj.helper = _BasicHelper(description, usages)
         self.cli = obj
 
-def cli_commands(obj, namef, clizer):
+def cli_commands(obj, namef, clizer, **kwargs):
     cmds = util.OrderedDict()
     try:
         names = util.dict_from_names(obj).items()
@@ -45,13 +48,14 @@ def cli_commands(obj, namef, clizer):
         if not key:
             continue
         names = tuple(namef(name) for name in util.maybe_iter(key))
-        cli = clizer.get_cli(val)
+        cli = clizer.get_cli(val, **kwargs)
         for name in names:
             func_to_names.setdefault(cli, []).append(name)
     cmds = util.OrderedDict((tuple(names), cli) for cli, names in func_to_names.items())
     cmd_by_name = {name: cli for names, cli in cmds.items() for name in names}
     return cmds, cmd_by_name
 
+
 class Clize(object):
     """Wraps a function into a CLI object that accepts command-line arguments
     and translates them to match the wrapped function's parameters."""
@@ -65,8 +69,9 @@ class Clize(object):
 
     def __init__(self, fn, owner=None, alt=(), extra=(),
                  help_names=('help', 'h'), helper_class=None, hide_help=False,
-                 description=None,
-                 ):
+                 description=None, response_files=None, chunk_size=None,
+                 workers=None, executor=None, fail_fast=True,
+                 loop_factory=None, conversion_workers=None, shell_names=()):
         """
         :param sequence alt: Alternate actions the CLI will handle.
         :param help_names: Names to use to trigger the help.
@@ -76,6 +81,49 @@ class Clize(object):
         :type helper_class: a type like `.ClizeHelp`
         :param bool hide_help: Mark the parameters used to trigger the help
             as undocumented.
+        :param response_files: If set, arguments of the form ``@path`` are
+            replaced with the arguments read from ``path``. Use ``'lines'``
+            (or `True`), ``'nul'`` or ``'shell'`` to pick the file format.
+            See `.parser.read_response_file`.
+        :param int chunk_size: If set, the function is called once for every
+            ``chunk_size`` values of its ``*args`` parameter, with the same
+            other arguments, and calling the CLI returns an iterable over the
+            results of each call. `run` prints each result as it is
+            produced. It has no effect on functions without ``*args``.
+            Values read with `.parameters.from_stdin` are only read as
+            each chunk is needed. When given to a `.SubcommandDispatcher`,
+            it applies to each subcommand.
+        :param int workers: If set, the calls made for each chunk are
+            distributed over a pool of this many workers. Their results are
+            still produced in the order of the arguments. Implies a
+            ``chunk_size`` of 1 unless specified. Like ``chunk_size``, it
+            applies to each subcommand of a `.SubcommandDispatcher`.
+        :param executor: The `concurrent.futures.Executor` class used to
+            create the pool, `concurrent.futures.ThreadPoolExecutor` by
+            default. With `concurrent.futures.ProcessPoolExecutor`, the
+            function and its arguments must be picklable.
+        :param bool fail_fast: If true, the first call to raise an exception
+            stops the remaining calls. Otherwise, all calls are made and the
+            exceptions are raised once they are done, as
+            `.errors.MultipleErrors` if there are several.
+        :param loop_factory: When the function returns a coroutine, for
+            instance when it is an ``async def`` function, it is run in an
+            event loop created by calling this, such as
+            ``uvloop.new_event_loop``. If unset, `asyncio.run` is used. When
+            the CLI object is called while an event loop is running, the
+            coroutine is returned for the caller to await instead. On a
+            `.SubcommandDispatcher`, it is used for each subcommand.
+        :param int conversion_workers: If set, the value converters of the
+            parameters are run concurrently in a pool of this many threads
+            once all arguments are read. This helps when there are many
+            values to convert and converting them involves waiting on I/O,
+            like `.converters.file` does. On a `.SubcommandDispatcher`, it
+            applies to the parameters of each subcommand.
+        :param shell_names: Names to use to trigger an interactive shell, in
+            which each line the user enters is run as a command line without
+            starting a new process. For instance, ``('shell',)`` adds a
+            ``--shell`` alternate action. See `.shell.Shell`.
+        :type shell_names: sequence of strings
         """
         if description:
             raise TypeError(
@@ -94,6 +142,29 @@ class Clize(object):
         self.help_aliases = [util.name_py2cli(s, kw=True) for s in help_names]
         self.helper_class = helper_class
         self.hide_help = hide_help
+        if response_files is True:
+            response_files = 'lines'
+        if response_files:
+            parser._check_response_file_format(response_files)
+        self.response_files = response_files
+        if workers is not None:
+            if workers < 1:
+                raise ValueError('workers must be at least 1')
+            if chunk_size is None:
+                chunk_size = 1
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError('chunk_size must be at least 1')
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.executor = executor
+        self.fail_fast = fail_fast
+        self.loop_factory = loop_factory
+        if conversion_workers is not None and conversion_workers < 1:
+            raise ValueError('conversion_workers must be at least 1')
+        self.conversion_workers = conversion_workers
+        self.shell_names = shell_names
+        self.shell_aliases = [
+            util.name_py2cli(s, kw=True) for s in shell_names]
 
     def __class_getitem__(cls, item):
         return parser.ClizeAnnotations(item)
@@ -107,6 +178,14 @@ class Clize(object):
             'help_names': self.help_names,
             'helper_class': self.helper_class,
             'hide_help': self.hide_help,
+            'response_files': self.response_files,
+            'chunk_size': self.chunk_size,
+            'workers': self.workers,
+            'executor': self.executor,
+            'fail_fast': self.fail_fast,
+            'loop_factory': self.loop_factory,
+            'conversion_workers': self.conversion_workers,
+            'shell_names': self.shell_names,
             }
 
     def _key(self):
@@ -119,6 +198,14 @@ class Clize(object):
             tuple(self.help_aliases),
             self.helper_class,
             self.hide_help,
+            self.response_files,
+            self.chunk_size,
+            self.workers,
+            self.executor,
+            self.fail_fast,
+            self.loop_factory,
+            self.conversion_workers,
+            tuple(self.shell_names),
         )
 
     def __eq__(self, other):
@@ -258,6 +345,12 @@ class Clize(object):
                 aliases=self.help_aliases)
             yield p
 
+        if self.shell_names:
+            from clize.shell import ShellCli
+            yield parser.AlternateCommandParameter(
+                func=ShellCli(self, self.owner).cli, undocumented=False,
+                aliases=self.shell_aliases)
+
         for name, func in self.alt.items():
             func = self.get_cli(func)
             param = parser.AlternateCommandParameter(
@@ -265,10 +358,80 @@ class Clize(object):
                 aliases=[util.name_py2cli(name, kw=True)])
             yield param
 
+    @util.property_once
+    def _varargs_index(self):
+        for i, param in enumerate(self.signature.positional):
+            if isinstance(param, parser.ExtraPosArgsParameter):
+                return i
+        return None
+
     def __call__(self, *args):
         with errors.SetUserErrorContext(cli=self, pname=args[0]):
             func, name, posargs, kwargs = self.read_commandline(args)
-            return func(*posargs, **kwargs)
+            return self._call_func(args[0], func, posargs, kwargs)
+
+    def _call_func(self, pname, func, posargs, kwargs):
+        if (self.chunk_size is not None and func is self.func
+                and self._varargs_index is not None
+                and not isinstance(self.owner, SubcommandDispatcher)):
+            return _ChunkResults(
+                self._call_in_chunks(pname, func, posargs, kwargs))
+        return run_coroutine(func(*posargs, **kwargs), self.loop_factory)
+
+    def _call_in_chunks(self, pname, func, posargs, kwargs):
+        with errors.SetUserErrorContext(cli=self, pname=pname):
+            posargs = iter(posargs)
+            fixed = list(itertools.islice(posargs, self._varargs_index))
+            call = partial(
+                _call_with_chunk, func, fixed, kwargs, self.loop_factory)
+            chunks = util.chunked(posargs, self.chunk_size)
+            first = next(chunks, None)
+            if first is None:
+                yield call([])
+                return
+            chunks = itertools.chain([first], chunks)
+            if self.workers is None:
+                for chunk in chunks:
+                    yield call(chunk)
+            else:
+                yield from self._map_in_pool(pname, call, chunks)
+
+    def _map_in_pool(self, pname, call, chunks):
+        executor = self.executor
+        if executor is None:
+            from concurrent.futures import ThreadPoolExecutor as executor
+        failures = []
+        with executor(max_workers=self.workers) as pool:
+            pending = collections.deque()
+            try:
+                for chunk in chunks:
+                    pending.append(pool.submit(call, chunk))
+                    if len(pending) > 2 * self.workers:
+                        yield from self._pop_result(pname, pending, failures)
+                while pending:
+                    yield from self._pop_result(pname, pending, failures)
+            finally:
+                for future in pending:
+                    future.cancel()
+        if len(failures) == 1:
+            raise failures[0]
+        elif failures:
+            for exc in failures:
+                if not isinstance(exc, errors.UserError):
+                    raise exc
+            raise errors.MultipleErrors(failures)
+
+    def _pop_result(self, pname, pending, failures):
+        future = pending.popleft()
+        try:
+            with errors.SetUserErrorContext(cli=self, pname=pname):
+                result = future.result()
+        except Exception as exc:
+            if self.fail_fast:
+                raise
+            failures.append(exc)
+        else:
+            yield result
 
     def read_commandline(self, args):
         """Reads the command-line arguments from args and returns a tuple
@@ -277,11 +440,67 @@ class Clize(object):
 
         :raises: `.ArgumentError`
         """
-        ba = self.signature.read_arguments(args[1:], args[0])
+        in_args = args[1:]
+        if self.response_files:
+            in_args = parser.expand_response_files(
+                in_args, format=self.response_files)
+        ba = self.signature.read_arguments(
+            in_args, args[0], conversion_workers=self.conversion_workers)
         func, post, posargs, kwargs = ba
+        if ba.lazy_args is not None:
+            posargs = itertools.chain(posargs, ba.lazy_args)
         name = ' '.join([args[0]] + post)
         return func or self.func, name, posargs, kwargs
 
+def run_coroutine(ret, loop_factory=None):
+    """If ``ret`` is a coroutine, runs it to completion in a new event loop
+    and returns its result. Otherwise, returns ``ret`` unchanged.
+
+    If an event loop is already running in the current thread, for instance
+    when a CLI object is called from an ``async def`` function, the
+    coroutine is returned unchanged so that the caller can await it.
+
+    :param loop_factory: A callable that creates the event loop to use.
+        If unset, `asyncio.run` is used.
+    """
+    if not inspect.iscoroutine(ret):
+        return ret
+    import asyncio
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        return ret
+    if loop_factory is None:
+        return asyncio.run(ret)
+    loop = loop_factory()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(ret)
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+
+def _call_with_chunk(func, fixed, kwargs, loop_factory, chunk):
+    return run_coroutine(func(*fixed, *chunk, **kwargs), loop_factory)
+
+
+class _ChunkResults(object):
+    """Iterable over the results of a function called once per chunk of
+    arguments"""
+
+    def __init__(self, results):
+        self.results = results
+
+    def __iter__(self):
+        return self.results
+
+
 def _dispatcher_helper(*args, **kwargs):
     """alias for clize.help.DispatcherHelper, avoiding circular import"""
     from clize.help import ClizeHelp, HelpForSubcommands
@@ -291,18 +510,38 @@ def _dispatcher_helper(*args, **kwargs):
 class SubcommandDispatcher(object):
     clizer = Clize
 
-    def __init__(self, commands=(), description=None, footnotes=None, **kwargs):
+    command_options = (
+        'chunk_size', 'workers', 'executor', 'fail_fast', 'loop_factory',
+        'conversion_workers')
+    """The `.Clize` options that apply to the subcommands rather than to the
+    dispatcher itself. Subcommands that already are CLI objects keep their
+    own."""
+
+    def __init__(self, commands=(), description=None, footnotes=None,
+                 pipeline_separator=None, **kwargs):
+        command_kwargs = {
+            key: kwargs.pop(key)
+            for key in self.command_options if key in kwargs}
         self.cmds, self.cmds_by_name = cli_commands(
-            commands, namef=util.name_py2cli, clizer=self.clizer)
+            commands, namef=util.name_py2cli, clizer=self.clizer,
+            **command_kwargs)
         self.description = description
         self.footnotes = footnotes
+        self.pipeline_separator = pipeline_separator
         self.clize_kwargs = kwargs
 
     @annotate(name=parameters.pass_name,
               command=parser.Parameter.LAST_OPTION)
     def _cli(self, name, command, *args):
+        if self.pipeline_separator is not None \
+                and self.pipeline_separator in args:
+            return self._run_pipeline(name, command, args)
+        return self._get_command(command)(
+            '{0} {1}'.format(name, command), *args)
+
+    def _get_command(self, command):
         try:
-            func = self.cmds_by_name[command.lower()]
+            return self.cmds_by_name[command.lower()]
         except KeyError:
             guess = util.closest_option(command, list(self.cmds_by_name))
             if guess:
@@ -310,7 +549,34 @@ class SubcommandDispatcher(object):
                     'Unknown command "{0}". Did you mean "{1}"?'
                     .format(command, guess))
             raise errors.ArgumentError('Unknown command "{0}"'.format(command))
-        return func('{0} {1}'.format(name, command), *args)
+
+    def _run_pipeline(self, name, command, args):
+        stages = [[command]]
+        for arg in args:
+            if arg == self.pipeline_separator:
+                stages.append([])
+            else:
+                stages[-1].append(arg)
+        funcs = []
+        for stage in stages:
+            if not stage:
+                raise errors.ArgumentError(
+                    'Missing command after "{0}"'
+                    .format(self.pipeline_separator))
+            func = self._get_command(stage[0])
+            if funcs and not _takes_pipeline_input(func):
+                raise errors.ArgumentError(
+                    'Command "{0}" cannot receive the output of the'
+                    ' previous command'.format(stage[0]))
+            funcs.append(func)
+        ret = None
+        for func, stage in zip(funcs, stages):
+            token = parameters._pipeline_value.set(ret)
+            try:
+                ret = func('{0} {1}'.format(name, stage[0]), *stage[1:])
+            finally:
+                parameters._pipeline_value.reset(token)
+        return ret
 
     @property
     def cli(self):
@@ -320,6 +586,16 @@ class SubcommandDispatcher(object):
         return c
 
 
+def _takes_pipeline_input(cli):
+    if not isinstance(cli, Clize) \
+            or isinstance(cli.owner, SubcommandDispatcher):
+        return True
+    return any(
+        getattr(param, 'value_factory', None)
+        is parameters.pipeline_input.__wrapped__
+        for param in cli.signature.parameters.values())
+
+
 def _get_executable(path, *, to_path=pathlib.PurePath, which=shutil.which) -> typing.Union[None, str]:
     """Get the shortest invocation for a given command"""
     if not path:
@@ -365,8 +641,192 @@ def _fix_argv(argv, sys_path, main_module, *, platform=sys.platform, executable=
     return argv
 
 
+_binary_types = (bytes, bytearray, memoryview)
+
+
+def _binary_output(out):
+    if isinstance(out, io.TextIOBase) or hasattr(out, 'encoding'):
+        return getattr(out, 'buffer', None)
+    return out
+
+
+class _OutputClosed(Exception):
+    """Raised when ``out`` is closed while the result is written to it"""
+
+
+@contextlib.contextmanager
+def _writing_output():
+    try:
+        yield
+    except BrokenPipeError as exc:
+        raise _OutputClosed() from exc
+
+
+def _print_value(value, out, end):
+    with _writing_output():
+        if isinstance(value, _binary_types):
+            binary_out = _binary_output(out)
+            if binary_out is not None:
+                if binary_out is not out:
+                    out.flush()
+                binary_out.write(value)
+                return
+        print(value, file=out, end=end)
+
+
+def _print_result(ret, out, end='\n'):
+    if isinstance(ret, _ChunkResults):
+        for result in ret:
+            _print_result(result, out, end)
+    elif isinstance(ret, collections.abc.Iterator):
+        try:
+            for item in ret:
+                if item is not None:
+                    _print_value(item, out, end)
+        finally:
+            close = getattr(ret, 'close', None)
+            if close is not None:
+                close()
+    elif ret is not None:
+        _print_value(ret, out, '\n')
+
+
+_OUTPUT_BUFFER_SIZE = 1 << 16
+
+
+def _iter_records(ret):
+    if ret is None:
+        return
+    if isinstance(ret, _ChunkResults):
+        for result in ret:
+            yield from _iter_records(result)
+    elif isinstance(ret, (collections.abc.Iterator, list, tuple)):
+        try:
+            yield from ret
+        finally:
+            close = getattr(ret, 'close', None)
+            if close is not None:
+                close()
+    else:
+        yield ret
+
+
+def _is_dataclass_instance(value):
+    return hasattr(type(value), '__dataclass_fields__')
+
+
+def _as_record(value):
+    if _is_dataclass_instance(value):
+        import dataclasses
+        return dataclasses.asdict(value)
+    return value
+
+
+class _BufferedWriter(object):
+    def __init__(self, out, size=_OUTPUT_BUFFER_SIZE):
+        self.out = out
+        self.size = size
+        self.parts = []
+        self.pending = 0
+
+    def write(self, s):
+        self.parts.append(s)
+        self.pending += len(s)
+        if self.pending >= self.size:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            with _writing_output():
+                self.out.write(''.join(self.parts))
+            self.parts = []
+            self.pending = 0
+
+
+def _json_default(value):
+    if _is_dataclass_instance(value):
+        import dataclasses
+        return dataclasses.asdict(value)
+    raise TypeError('Object of type {0} is not JSON serializable'.format(
+        type(value).__name__))
+
+
+def _write_jsonl(records, out):
+    import json
+    encoder = json.JSONEncoder(default=_json_default)
+    writer = _BufferedWriter(out)
+    for record in records:
+        writer.write(encoder.encode(_as_record(record)))
+        writer.write('\n')
+    writer.flush()
+
+
+def _write_csv(records, out):
+    import csv
+    writer = _BufferedWriter(out)
+    csv_writer = fields = None
+    for number, record in enumerate(records, 1):
+        record = _as_record(record)
+        if csv_writer is None:
+            if isinstance(record, dict):
+                fields = set(record)
+                csv_writer = csv.DictWriter(writer, list(record))
+                csv_writer.writeheader()
+            else:
+                csv_writer = csv.writer(writer)
+        elif isinstance(record, dict) != (fields is not None):
+            writer.flush()
+            raise errors.UserError(
+                'Cannot write record {0} as CSV: expected {1} like the first '
+                'record'.format(number, 'a dictionary' if fields is not None
+                                else 'a sequence of values'))
+        elif fields is not None:
+            extra = [key for key in record if key not in fields]
+            if extra:
+                writer.flush()
+                raise errors.UserError(
+                    'Cannot write record {0} as CSV: {1} not in the header'
+                    .format(number, ', '.join(map(str, extra))))
+        csv_writer.writerow(record)
+    writer.flush()
+
+
+output_formats = {
+    'jsonl': _write_jsonl,
+    'csv': _write_csv,
+}
+"""The output formats that can be passed to `run` by name."""
+
+
+def _exit(code, fast_exit, out, err):
+    if not fast_exit:
+        sys.exit(code or None)
+    if fast_exit is not True:
+        for hook in fast_exit:
+            hook()
+    for f in (out, err, sys.stdout, sys.stderr):
+        try:
+            f.flush()
+        except (AttributeError, OSError, ValueError):
+            pass
+    os._exit(code)
+
+
+def _silence_broken_pipe(out):
+    try:
+        fileno = out.fileno()
+    except (AttributeError, OSError, ValueError):
+        return
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, fileno)
+    finally:
+        os.close(devnull)
+
+
 @autokwoargs
-def run(args=None, catch=(), exit=True, out=None, err=None, *fn, **kwargs):
+def run(args=None, catch=(), exit=True, out=None, err=None, end='\n',
+        output_format=None, fast_exit=False, *fn, **kwargs):
     """Runs a function or :ref:`CLI object<cli-object>` with ``args``, prints
     the return value if not None, or catches the given exception types as well
     as `clize.UserError` and prints their string representation, then exit with
@@ -383,32 +843,364 @@ def run(args=None, catch=(), exit=True, out=None, err=None, *fn, **kwargs):
         command. If unspecified, uses `sys.stdout`
     :param file err: The file in which to print any exception text.
         If unspecified, uses `sys.stderr`.
+    :param str end: When the command returns an iterator, such as a
+        generator, each item is printed as soon as it is produced, followed
+        by this string.
 
-    """
-    if len(fn) == 1:
-        fn = fn[0]
-    cli = Clize.get_cli(fn, **kwargs)
+    `bytes`, `bytearray` and `memoryview` values, whether returned or
+    produced by an iterator, are written as-is to ``out.buffer``, or to
+    ``out`` itself if it is a binary file, without any separator.
+
+    :param output_format: Serialize the return value instead of printing it.
+        ``'jsonl'`` writes each record as a line of JSON and ``'csv'`` writes
+        each record as a CSV row, with a header row if the records are
+        dictionaries. CSV records must all be dictionaries or all be
+        sequences, and dictionaries may leave out keys of the first record
+        but not add new ones. When the return value is an iterator, a list or a tuple,
+        each of its items is a record, and records are written as they are
+        produced. Dataclass instances are converted to dictionaries. You
+        can also pass a function that takes the iterable of records and
+        ``out``. See `output_formats`. Strings, such as the help text, are
+        printed as usual.
+    :param fast_exit: If true and ``exit`` is true, flush ``out``, ``err``
+        and the standard streams, then end the process immediately with
+        `os._exit`, skipping the interpreter's teardown. This saves time
+        after commands that leave many objects behind, but skips
+        ``finally`` clauses further up the stack, object finalizers and
+        the handlers registered with `atexit`, including the one that
+        flushes `logging` handlers. Pass a sequence of callables instead of
+        `True` to call them before exiting, for instance
+        ``fast_exit=[logging.shutdown]``. `os._exit` behaves the same way
+        on CPython and PyPy.
 
+    If ``out`` is closed while the return value is printed, for instance
+    when the output is piped into ``head``, the remaining output is
+    discarded and the exit status is 1.
+    """
+    cli = _get_cli(fn, kwargs)
     if args is None:
-        # import __main__ causes double imports when
-        # python2.7 -m apackage
-        # is used
-        module = sys.modules['__main__']
-        args = _fix_argv(sys.argv, sys.path, module)
+        args = _default_args()
     if out is None:
         out = sys.stdout
     if err is None:
         err = sys.stderr
+    output_format = _get_output_format(output_format)
 
+    try:
+        code = _run_command(cli, args, catch, out, err, end, output_format)
+    except _OutputClosed:
+        _silence_broken_pipe(out)
+        code = 1
+    if exit:
+        _exit(code, fast_exit, out, err)
+
+
+def _get_cli(fn, kwargs):
+    if len(fn) == 1:
+        fn = fn[0]
+    return Clize.get_cli(fn, **kwargs)
+
+
+def _default_args():
+    # import __main__ causes double imports when
+    # python2.7 -m apackage
+    # is used
+    module = sys.modules['__main__']
+    return _fix_argv(sys.argv, sys.path, module)
+
+
+def _get_output_format(output_format):
+    if isinstance(output_format, str):
+        try:
+            return output_formats[output_format]
+        except KeyError:
+            raise ValueError(
+                'Unknown output format: {0!r}'.format(output_format))
+    return output_format
+
+
+def _run_command(cli, args, catch, out, err, end, output_format):
     try:
         ret = cli(*args)
+        with errors.SetUserErrorContext(pname=args[0]):
+            if output_format is None or isinstance(ret, str):
+                _print_result(ret, out, end)
+            elif output_format in output_formats.values():
+                output_format(_iter_records(ret), out)
+            else:
+                with _writing_output():
+                    output_format(_iter_records(ret), out)
+            with _writing_output():
+                out.flush()
+    except _OutputClosed:
+        raise
     except tuple(catch) + (errors.UserError,) as exc:
         print(str(exc), file=err)
-        if exit:
-            sys.exit(2 if isinstance(exc, errors.ArgumentError) else 1)
+        return 2 if isinstance(exc, errors.ArgumentError) else 1
+    return 0
+
+
+@autokwoargs
+def run_batch(lines, name=None, catch=(), out=None, err=None, end='\n',
+              output_format=None, jobs=1, ordered=True, timeout=None,
+              *fn, **kwargs):
+    """Runs each line of ``lines`` as a separate command line and returns
+    the list of their exit statuses.
+
+    The CLI is built once, as `run` does with ``fn`` and ``kwargs``, and
+    each line is split into arguments with `shlex.split`. Empty lines and
+    comments starting with ``#`` are skipped and have no exit status. The
+    output of each command is written and flushed as soon as it finishes,
+    and errors are printed to ``err`` without stopping the batch.
+
+    ::
+
+        with open('commands.txt') as f:
+            statuses = run_batch(f, commands, jobs=8, timeout=60)
+        sys.exit(max(statuses, default=0))
+
+    :param lines: An iterable of strings, such as an open file. It is read
+        one line at a time.
+    :param str name: The program name used in messages. If unspecified,
+        it is derived from `sys.argv` like `run` does.
+    :param int jobs: How many commands may run at the same time. ``None``
+        uses `os.cpu_count`.
+    :param bool ordered: With several jobs, write the output of the
+        commands in the order of ``lines`` rather than in the order they
+        finish.
+    :param float timeout: Stop commands that take longer than this many
+        seconds. Their output is discarded and their exit status is 124.
+
+    When ``jobs`` isn't 1 or ``timeout`` is given, each command runs in a
+    child process forked from this one, which shares the CLI that is
+    already built. Its output, including what it prints to `sys.stdout` and
+    `sys.stderr`, is collected and written once it finishes. This requires
+    `os.fork`.
+
+    ``catch``, ``out``, ``err``, ``end`` and ``output_format`` have the same
+    meaning as for `run`. If ``out`` is closed while a result is printed,
+    that command's exit status is 1 and the remaining lines are not run.
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs < 1:
+        raise ValueError('jobs must be at least 1')
+    if timeout is not None and timeout <= 0:
+        raise ValueError('timeout must be positive')
+    cli = _get_cli(fn, kwargs)
+    if name is None:
+        name = _default_args()[0]
+    if out is None:
+        out = sys.stdout
+    if err is None:
+        err = sys.stderr
+    output_format = _get_output_format(output_format)
+
+    commands = _batch_commands(name, lines)
+    if jobs != 1 or timeout is not None:
+        return _run_forked(
+            commands, cli, name, catch, out, err, end, output_format,
+            jobs, ordered, timeout)
+    statuses = []
+    for lineno, args, error in commands:
+        if error is not None:
+            print(error, file=err)
+            statuses.append(2)
+            continue
+        try:
+            statuses.append(_run_command(
+                cli, args, catch, out, err, end, output_format))
+        except _OutputClosed:
+            _silence_broken_pipe(out)
+            statuses.append(1)
+            break
+    return statuses
+
+
+def _batch_commands(name, lines):
+    import shlex
+    for lineno, line in enumerate(lines, 1):
+        try:
+            args = shlex.split(line, comments=True)
+        except ValueError as exc:
+            yield lineno, None, '{0}: line {1}: {2}'.format(name, lineno, exc)
+            continue
+        if args:
+            yield lineno, [name] + args, None
+
+
+_batch_header = '!iQQ'
+
+
+def _capture(f):
+    if _binary_output(f) is f:
+        return io.BytesIO()
+    return io.TextIOWrapper(
+        io.BytesIO(), encoding=getattr(f, 'encoding', None) or 'utf-8',
+        errors=getattr(f, 'errors', None) or 'strict')
+
+
+def _captured(capture):
+    capture.flush()
+    return getattr(capture, 'buffer', capture).getvalue()
+
+
+def _write_captured(f, data):
+    if not data:
+        return
+    if isinstance(data, str):
+        f.write(data)
     else:
-        if ret is not None:
-            print(ret, file=out)
-        if exit:
-            sys.exit()
+        binary_out = _binary_output(f)
+        if binary_out is None:
+            f.write(data.decode(getattr(f, 'encoding', None) or 'utf-8'))
+        else:
+            if binary_out is not f:
+                f.flush()
+            binary_out.write(data)
+    f.flush()
+
+
+def _batch_child(fd, cli, args, catch, out, err, end, output_format):
+    try:
+        status = 1
+        captured_out = _capture(out)
+        captured_err = _capture(err)
+        if out is sys.stdout:
+            sys.stdout = captured_out
+        if err is sys.stderr:
+            sys.stderr = captured_err
+        try:
+            status = _run_command(
+                cli, args, catch, captured_out, captured_err, end,
+                output_format)
+        except SystemExit as exc:
+            if exc.code is None or isinstance(exc.code, int):
+                status = exc.code or 0
+            else:
+                print(exc.code, file=captured_err)
+        except BaseException:
+            import traceback
+            traceback.print_exc(file=captured_err)
+        out_data = _captured(captured_out)
+        err_data = _captured(captured_err)
+        import struct
+        view = memoryview(
+            struct.pack(_batch_header, status, len(out_data), len(err_data))
+            + out_data + err_data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os._exit(0)
+
+
+class _BatchJob(object):
+    def __init__(self, index, lineno, deadline):
+        self.index = index
+        self.lineno = lineno
+        self.deadline = deadline
+        self.chunks = []
+
+    def start(self, *args):
+        self.fd, write_fd = os.pipe()
+        self.pid = os.fork()
+        if self.pid == 0:
+            os.close(self.fd)
+            _batch_child(write_fd, *args)
+        os.close(write_fd)
+
+    def stop(self, kill=False):
+        os.close(self.fd)
+        if kill:
+            import signal
+            os.kill(self.pid, signal.SIGKILL)
+        os.waitpid(self.pid, 0)
+
+    def result(self, name):
+        import struct
+        data = b''.join(self.chunks)
+        start = struct.calcsize(_batch_header)
+        if len(data) >= start:
+            status, out_size, err_size = struct.unpack_from(
+                _batch_header, data)
+            if len(data) == start + out_size + err_size:
+                return (status, data[start:start+out_size],
+                        data[start+out_size:])
+        return 1, b'', '{0}: line {1}: the command exited unexpectedly\n'.format(
+            name, self.lineno)
+
+
+def _run_forked(commands, cli, name, catch, out, err, end, output_format,
+                jobs, ordered, timeout):
+    import selectors
+    import time
+    statuses = {}
+    results = {}
+    running = {}
+    index = 0
+    next_write = 0
+    selector = selectors.DefaultSelector()
+    try:
+        while True:
+            while len(running) < jobs:
+                try:
+                    lineno, args, error = next(commands)
+                except StopIteration:
+                    break
+                if error is not None:
+                    results[index] = 2, b'', error + '\n'
+                else:
+                    job = _BatchJob(
+                        index, lineno,
+                        None if timeout is None else time.monotonic() + timeout)
+                    job.start(cli, args, catch, out, err, end, output_format)
+                    running[job.fd] = job
+                    selector.register(job.fd, selectors.EVENT_READ, job)
+                index += 1
+
+            for i in sorted(results) if ordered else list(results):
+                if ordered and i != next_write:
+                    break
+                status, out_data, err_data = results.pop(i)
+                statuses[i] = status
+                next_write += 1
+                try:
+                    _write_captured(out, out_data)
+                except BrokenPipeError:
+                    _silence_broken_pipe(out)
+                    statuses[i] = 1
+                    return [statuses[i] for i in sorted(statuses)]
+                _write_captured(err, err_data)
+
+            if not running:
+                return [statuses[i] for i in sorted(statuses)]
 
+            wait = None
+            if timeout is not None:
+                deadline = min(job.deadline for job in running.values())
+                wait = max(0, deadline - time.monotonic())
+            for key, events in selector.select(wait):
+                job = key.data
+                chunk = os.read(job.fd, 1 << 16)
+                if chunk:
+                    job.chunks.append(chunk)
+                    continue
+                selector.unregister(job.fd)
+                del running[job.fd]
+                job.stop()
+                results[job.index] = job.result(name)
+            if timeout is not None:
+                now = time.monotonic()
+                for job in list(running.values()):
+                    if job.deadline <= now:
+                        selector.unregister(job.fd)
+                        del running[job.fd]
+                        job.stop(kill=True)
+                        results[job.index] = (
+                            124, b'',
+                            '{0}: line {1}: timed out after {2} seconds\n'
+                            .format(name, job.lineno, timeout))
+    finally:
+        for job in running.values():
+            job.stop(kill=True)
+        selector.close()
@@ -0,0 +1,211 @@
+# clize -- A command-line argument parser for Python
+# Copyright (C) 2011-2022 by Yann Kaiser and contributors. See AUTHORS and
+# COPYING for details.
+
+"""Keep a CLI loaded in a server process and run commands in forked children
+
+The server imports the application once, then listens on a Unix domain
+socket. The client, `clize_client`, sends its arguments, working directory,
+environment and standard streams to the server, which forks a child that
+runs the command with them and reports its exit status back to the client.
+
+Only available on platforms that support ``fork`` and passing file
+descriptors over Unix domain sockets.
+"""
+
+import array
+import gc
+import io
+import json
+import os
+import signal
+import socket
+import sys
+import traceback
+
+from clize import parser, runner
+from clize_client import _STDIO_FDS, _header, _recv_exactly, _status
+
+
+def _receive_request(sock):
+    fds = array.array('i')
+    data, ancdata, flags, addr = sock.recvmsg(
+        1 << 16, socket.CMSG_SPACE(_STDIO_FDS * fds.itemsize))
+    for level, type_, cdata in ancdata:
+        if level == socket.SOL_SOCKET and type_ == socket.SCM_RIGHTS:
+            usable = len(cdata) - len(cdata) % fds.itemsize
+            fds.frombytes(cdata[:usable])
+    try:
+        if len(fds) != _STDIO_FDS:
+            raise ValueError('Expected {0} file descriptors, got {1}'
+                             .format(_STDIO_FDS, len(fds)))
+        data = _recv_exactly(sock, _header.size, data)
+        size, = _header.unpack_from(data)
+        data = _recv_exactly(sock, _header.size + size, data)
+        request = json.loads(data[_header.size:].decode('utf-8'))
+    except BaseException:
+        for fd in fds:
+            os.close(fd)
+        raise
+    return request, list(fds)
+
+
+def _reopen_stdio():
+    sys.stdin = io.open(0, 'r', closefd=False)
+    sys.stdout = io.open(
+        1, 'w', buffering=1 if os.isatty(1) else -1, closefd=False)
+    sys.stderr = io.open(
+        2, 'w', buffering=1, errors='backslashreplace', closefd=False)
+
+
+def _exit_status(code):
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _run_command(cli, name, args, catch):
+    try:
+        runner.run(cli, args=[name] + list(args), catch=catch)
+    except SystemExit as exc:
+        return _exit_status(exc.code)
+    return 0
+
+
+def _child(listener, conn, fds, request, cli, name, catch):
+    status = 1
+    try:
+        listener.close()
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+        for fd in fds:
+            if fd >= _STDIO_FDS:
+                os.close(fd)
+        _reopen_stdio()
+        os.chdir(request['cwd'])
+        os.environ.clear()
+        os.environ.update(request['env'])
+        status = _run_command(cli, name, request['args'], catch)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+        try:
+            conn.sendall(_status.pack(status))
+        except Exception:
+            pass
+        os._exit(status)
+
+
+def _warm(cli, seen):
+    if not isinstance(cli, runner.Clize) or cli in seen:
+        return
+    seen.add(cli)
+    cli.helper
+    for param in cli.signature.alternate:
+        if isinstance(param, parser.AlternateCommandParameter):
+            _warm(param.func, seen)
+        elif isinstance(param.func, runner.Clize):
+            param.func.signature
+    if isinstance(cli.owner, runner.SubcommandDispatcher):
+        for command in cli.owner.cmds.values():
+            _warm(command, seen)
+
+
+def prewarm(cli):
+    """Builds everything about ``cli`` that Clize otherwise builds on
+    demand, so that processes forked afterwards share it rather than each
+    building it again.
+
+    This includes the `.parser.CliSignature` and helper of ``cli``, of its
+    alternate commands and, for `.SubcommandDispatcher`, of every
+    subcommand.
+
+    :param cli: The object returned by `.Clize.get_cli`.
+    """
+    _warm(cli, set())
+
+
+def serve(path, *fn, name=None, catch=(), warm=True, on_ready=None,
+          request_timeout=5, **kwargs):
+    """Listens on the Unix domain socket at ``path`` and runs the CLI for
+    each client that connects, in a child process forked from this one.
+
+    ``fn`` and ``kwargs`` are interpreted like `clize.run` does. The
+    clients can use `clize_client.connect`, or run ``python -m clize_client
+    PATH [ARGS...]``, which does not import clize.
+
+    Each child gets the client's arguments, working directory, environment
+    and standard streams, and its exit status is sent back to the client.
+    This function only returns after it is interrupted, at which point the
+    socket file is removed.
+
+    :param str path: Where to create the socket. Only the user running the
+        server may connect to it.
+    :param str name: The program name shown in messages. Defaults to
+        ``sys.argv[0]``'s base name.
+    :param catch: Passed to `clize.run` in the children.
+    :param bool warm: Call `prewarm` before listening, then move every
+        object to the permanent generation with `gc.freeze`, so that the
+        children neither build the signatures again nor touch the shared
+        memory pages when they collect garbage.
+    :param on_ready: Called once the server is listening.
+    :param float request_timeout: How many seconds a client has to send its
+        request once connected. Clients are accepted one at a time, so this
+        keeps one that stalls from holding up the others.
+    """
+    if len(fn) == 1:
+        fn = fn[0]
+    cli = runner.Clize.get_cli(fn, **kwargs)
+    if name is None:
+        name = os.path.basename(sys.argv[0])
+    if warm:
+        prewarm(cli)
+        gc.collect()
+        gc.freeze()
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        umask = os.umask(0o177)
+        try:
+            listener.bind(path)
+        finally:
+            os.umask(umask)
+        listener.listen()
+        previous_sigchld = signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        try:
+            if on_ready is not None:
+                on_ready()
+            _accept_loop(listener, cli, name, catch, request_timeout)
+        finally:
+            signal.signal(signal.SIGCHLD, previous_sigchld)
+            os.unlink(path)
+    finally:
+        listener.close()
+
+
+def _accept_loop(listener, cli, name, catch, request_timeout):
+    while True:
+        conn, _ = listener.accept()
+        with conn:
+            conn.settimeout(request_timeout)
+            try:
+                request, fds = _receive_request(conn)
+            except (OSError, EOFError, ValueError):
+                continue
+            conn.settimeout(None)
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                if os.fork() == 0:
+                    _child(listener, conn, fds, request, cli, name, catch)
+            finally:
+                for fd in fds:
+                    os.close(fd)
@@ -0,0 +1,159 @@
+# clize -- A command-line argument parser for Python
+# Copyright (C) 2011-2022 by Yann Kaiser and contributors. See AUTHORS and
+# COPYING for details.
+
+"""
+`clize.shell` provides an interactive shell that runs each line it reads as
+a command line, in the same process.
+
+`.ShellCli` is the command-line interface for it. It is injected as an
+alternate action by `.Clize` when it is given ``shell_names``.
+"""
+
+import cmd
+import shlex
+import sys
+import traceback
+
+from sigtools.modifiers import annotate
+
+from clize import runner, parser, parameters
+
+
+def _split(line):
+    try:
+        return shlex.split(line)
+    except ValueError:
+        return line.split()
+
+
+def completions(cli, words):
+    """Returns the arguments that could follow ``words`` on a command line
+    for ``cli``, based on its `.parser.CliSignature`: the subcommands of a
+    `.SubcommandDispatcher`, the aliases of named parameters and the values
+    of `.parameters.mapped` parameters.
+
+    :param cli: The object returned by `.Clize.get_cli`.
+    :param sequence words: The complete arguments already on the command
+        line, not including the program name.
+    """
+    if not isinstance(cli, runner.Clize):
+        return []
+    owner = cli.owner
+    if isinstance(owner, runner.SubcommandDispatcher):
+        separator = owner.pipeline_separator
+        if separator is not None and separator in words:
+            last = len(words) - words[::-1].index(separator)
+            words = words[last:]
+        if not words:
+            return list(owner.cmds_by_name) + list(cli.signature.aliases)
+        try:
+            command = owner.cmds_by_name[words[0].lower()]
+        except KeyError:
+            return []
+        return completions(command, words[1:])
+    sig = cli.signature
+    if words:
+        param = sig.aliases.get(words[-1])
+        if param is not None and parser.takes_value(param):
+            return param.value_choices()
+    return list(sig.aliases)
+
+
+class Shell(cmd.Cmd):
+    """Reads command lines and runs them with ``subject``.
+
+    :param subject: The CLI object the lines are passed to.
+    :param str name: The program name used in messages and in the prompt.
+    """
+
+    exit_commands = ('exit', 'quit')
+
+    def __init__(self, subject, name, stdin=None, stdout=None, stderr=None):
+        super(Shell, self).__init__(stdin=stdin, stdout=stdout)
+        self.subject = subject
+        self.name = name
+        self.stderr = sys.stderr if stderr is None else stderr
+        self.prompt = '{0}> '.format(name)
+        if stdin is not None:
+            self.use_rawinput = False
+        self._previous_delims = None
+
+    def cmdloop(self, intro=None):
+        """Runs lines until the end of the input or an exit command.
+        Interrupting the shell at the prompt discards the line being
+        entered."""
+        while True:
+            try:
+                return super(Shell, self).cmdloop(intro)
+            except KeyboardInterrupt:
+                print(file=self.stdout)
+                intro = ''
+
+    def preloop(self):
+        if self._previous_delims is not None:
+            return
+        try:
+            import readline
+        except ImportError:
+            return
+        self._previous_delims = readline.get_completer_delims()
+        readline.set_completer_delims(' \t\n')
+
+    def postloop(self):
+        if self._previous_delims is not None:
+            import readline
+            readline.set_completer_delims(self._previous_delims)
+            self._previous_delims = None
+
+    def emptyline(self):
+        pass
+
+    def onecmd(self, line):
+        if line == 'EOF':
+            print(file=self.stdout)
+            return True
+        try:
+            args = shlex.split(line, comments=True)
+        except ValueError as exc:
+            print('{0}: {1}'.format(self.name, exc), file=self.stderr)
+            return False
+        if not args:
+            return False
+        if len(args) == 1 and args[0] in self.exit_commands \
+                and args[0] not in completions(self.subject, []):
+            return True
+        try:
+            runner._run_command(
+                self.subject, [self.name] + args, (),
+                self.stdout, self.stderr, '\n', None)
+        except KeyboardInterrupt:
+            print(file=self.stdout)
+        except SystemExit:
+            pass
+        except Exception:
+            traceback.print_exc(file=self.stderr)
+        return False
+
+    def _complete(self, text, line, begidx, endidx):
+        words = _split(line[:begidx])
+        return sorted(
+            candidate for candidate in completions(self.subject, words)
+            if candidate.startswith(text))
+
+    completenames = completedefault = complete_help = _complete
+
+
+class ShellCli(object):
+    """A command-line interface that starts a `Shell` for ``subject``"""
+
+    def __init__(self, subject, owner):
+        self.subject = subject
+        self.owner = owner
+
+    @runner.Clize(hide_help=True)
+    @annotate(name=parameters.pass_name)
+    def cli(self, name):
+        """Start an interactive shell"""
+        name = name.rpartition(' ')[0]
+        Shell(self.subject, name).cmdloop()
@@ -0,0 +1,155 @@
+# clize -- A command-line argument parser for Python
+# Copyright (C) 2011-2022 by Yann Kaiser and contributors. See AUTHORS and
+# COPYING for details.
+
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from clize import runner, parameters, SubcommandDispatcher
+from clize.completion import completion_data, completion_script, main
+from clize.tests.util import Tests
+
+
+colors = parameters.mapped([
+    ('red', ('red', 'r'), 'Red'),
+    ('green', ('green',), 'Green'),
+    ('other', ("it's", 'two words'), 'Unrepresentable'),
+])
+
+
+def add(a: int, b: int, *, negate=False, label=''):
+    """Adds numbers"""
+    raise NotImplementedError
+
+
+def pick(kind: colors, *, color: colors='red'):
+    """Picks a color"""
+    raise NotImplementedError
+
+
+def files(*paths):
+    raise NotImplementedError
+
+
+cli = {
+    'add': add,
+    'pick': pick,
+    'files': files,
+    'group': SubcommandDispatcher([add, pick]),
+}
+
+
+class CompletionDataTests(Tests):
+    def test_dispatcher(self):
+        data = completion_data(runner.Clize.get_cli(cli))
+        self.assertEqual(data['c|'], 'add pick files group')
+        self.assertEqual(data['c|group'], 'add pick')
+        self.assertEqual(data['o|'], '--help -h')
+        self.assertEqual(data['o|add'], '--help --label --negate -h')
+        self.assertEqual(data['o|group pick'], '--color --help -h')
+        self.assertNotIn('s', data)
+
+    def test_values(self):
+        data = completion_data(runner.Clize.get_cli(cli))
+        self.assertEqual(data['v|add|--label'], '')
+        self.assertNotIn('v|add|--negate', data)
+        self.assertEqual(data['v|pick|--color'], 'red r green')
+        self.assertEqual(data['p|pick|0'], 'red r green')
+        self.assertNotIn('p|add|0', data)
+        self.assertNotIn('P|files', data)
+
+    def test_single(self):
+        data = completion_data(runner.Clize.get_cli(pick))
+        self.assertEqual(data, {
+            'o|': '--color --help -h',
+            'v||--color': 'red r green',
+            'p||0': 'red r green',
+        })
+
+    def test_inserted_positional(self):
+        def named(name: parameters.pass_name, kind: colors):
+            raise NotImplementedError
+        data = completion_data(runner.Clize.get_cli(named))
+        self.assertEqual(data['p||1'], 'red r green')
+
+    def test_pipeline(self):
+        data = completion_data(
+            runner.Clize.get_cli([add, pick], pipeline_separator=':::'))
+        self.assertEqual(data['s'], ':::')
+
+
+class CompletionScriptTests(Tests):
+    def test_shells(self):
+        for shell, expected in [
+                ('bash', "complete -o filenames -F _clize_my_tool my-tool"),
+                ('zsh', "compdef _clize_my_tool my-tool"),
+                ('fish', "complete -c my-tool -f -a '(_clize_my_tool)'"),
+                ]:
+            script = completion_script(
+                runner.Clize.get_cli(cli), 'my-tool', shell)
+            self.assertIn(expected, script)
+            self.assertIn('green', script)
+
+    def test_unknown_shell(self):
+        with self.assertRaises(ValueError):
+            completion_script(runner.Clize.get_cli(cli), 'tool', 'csh')
+
+    def test_bad_name(self):
+        for name in ('my tool', 'tool;rm', '$(tool)', 'tool\nx', ''):
+            with self.assertRaises(ValueError):
+                completion_script(runner.Clize.get_cli(cli), name, 'bash')
+
+    def test_main_bad_name(self):
+        out, err = self.crun(
+            main, ['test', 'clize.tests.test_completion:cli', '--name=a b'])
+        self.assertEqual(out.getvalue(), '')
+        self.assertTrue(
+            err.getvalue().startswith("test: Unsupported program name: 'a b'"))
+
+    def test_main(self):
+        out, err = self.crun(
+            main, ['test', 'clize.tests.test_completion:cli', '--shell=zsh'])
+        self.assertTrue(out.getvalue().startswith('#compdef test_completion\n'))
+        self.assertEqual(err.getvalue(), '')
+
+    def test_main_bad_target(self):
+        out, err = self.crun(main, ['test', 'clize.tests.test_completion'])
+        self.assertTrue(err.getvalue().startswith('test: Expected module:'))
+
+
+@unittest.skipUnless(shutil.which('bash'), 'bash is required')
+class BashCompletionTests(Tests):
+    @classmethod
+    def setUpClass(cls):
+        cls.script = completion_script(
+            runner.Clize.get_cli(cli), 'tool', 'bash')
+
+    def complete(self, line):
+        with tempfile.NamedTemporaryFile('w', suffix='.bash') as f:
+            f.write(self.script)
+            f.flush()
+            proc = subprocess.run(
+                ['bash', '--norc', '--noprofile', '-c',
+                 'source "$1"; COMP_LINE="$2"; COMP_POINT=${#2}; _clize_tool;'
+                 ' printf "%s\\n" "${COMPREPLY[@]}"', 'bash', f.name, line],
+                capture_output=True, text=True, check=True)
+        return proc.stdout.split()
+
+    def test_commands(self):
+        self.assertEqual(self.complete('tool '),
+                         ['add', 'pick', 'files', 'group'])
+        self.assertEqual(self.complete('tool gr'), ['group'])
+        self.assertEqual(self.complete('tool group '), ['add', 'pick'])
+
+    def test_options(self):
+        self.assertEqual(self.complete('tool add 1 --negate --'),
+                         ['--help', '--label', '--negate'])
+        self.assertEqual(self.complete('tool group pick --c'), ['--color'])
+
+    def test_values(self):
+        self.assertEqual(self.complete('tool pick red --color '),
+                         ['red', 'r', 'green'])
+        self.assertEqual(self.complete('tool pick --color=g'), ['green'])
+        self.assertEqual(self.complete('tool pick --color red g'), ['green'])
@@ -8,7 +8,11 @@ import shutil
 import os
 import stat
 import sys
-from io import StringIO
+import bz2
+import gzip
+import lzma
+import mmap
+from io import BufferedReader, BytesIO, StringIO, TextIOWrapper
 
 from sigtools import support, modifiers
 
@@ -283,6 +287,292 @@ class FileConverterTests(Tests):
         self.assertFalse(stderr.getvalue())
 
 
+    def test_mmap(self):
+        path = os.path.join(self.temp, 'afile')
+        with open(path, 'wb') as f:
+            f.write(b'abcdef')
+        @modifiers.annotate(afile=converters.file(mmap=True))
+        def func(afile):
+            with afile as data:
+                self.assertIsInstance(data, mmap.mmap)
+                self.assertEqual(b'cd', data[2:4])
+                with self.assertRaises(TypeError):
+                    data[0] = ord('x')
+            self.assertTrue(data.closed)
+            self.completed = True
+        o, e = self.crun(func, ['test', path])
+        self.assertFalse(e.getvalue())
+        self.assertTrue(self.completed)
+
+    def test_mmap_empty(self):
+        path = os.path.join(self.temp, 'afile')
+        open(path, 'w').close()
+        with converters.file(path, mmap=True) as data:
+            self.assertEqual(b'', bytes(data))
+
+    def test_mmap_stdin(self):
+        stdin = TextIOWrapper(BytesIO(b'abc\ndef'))
+        @modifiers.annotate(afile=converters.file(mmap=True))
+        def func(afile):
+            with afile as data:
+                self.assertEqual(b'abc\ndef', bytes(data))
+            self.completed = True
+        o, e = self.crun(func, ['test', '-'], stdin=stdin)
+        self.assertFalse(e.getvalue())
+        self.assertTrue(self.completed)
+        self.assertTrue(stdin.closed)
+
+    def test_mmap_stdin_spooled(self):
+        content = bytes(range(256)) * 10
+        with converters._spool(BytesIO(content), max_size=100) as data:
+            self.assertIsInstance(data, mmap.mmap)
+            self.assertEqual(content, data[:])
+
+    def test_mmap_missing(self):
+        path = os.path.join(self.temp, 'afile')
+        self.assertRaises(errors.BadArgumentFormat,
+                          self.run_conv, converters.file(mmap=True), path)
+
+    def test_mmap_write(self):
+        self.assertRaises(ValueError, converters.file, mode='w', mmap=True)
+
+
+    def test_compression_suffix(self):
+        path = os.path.join(self.temp, 'afile.gz')
+        with converters.file(path, mode='w', compression='auto') as f:
+            f.write('hello')
+        with gzip.open(path, 'rt') as f:
+            self.assertEqual('hello', f.read())
+        with converters.file(path, compression='auto') as f:
+            self.assertEqual('hello', f.read())
+
+    def test_compression_magic(self):
+        path = os.path.join(self.temp, 'afile')
+        with lzma.open(path, 'wb') as f:
+            f.write(b'hello')
+        with converters.file(path, compression='auto') as f:
+            self.assertEqual('hello', f.read())
+        with converters.file(path, mode='rb', compression='xz') as f:
+            self.assertEqual(b'hello', f.read())
+
+    def test_compression_auto_plain(self):
+        path = os.path.join(self.temp, 'afile')
+        with open(path, 'w') as f:
+            f.write('hello')
+        with converters.file(path, compression='auto') as f:
+            self.assertEqual('hello', f.read())
+
+    def test_compression_stdin(self):
+        stdin = TextIOWrapper(BufferedReader(BytesIO(gzip.compress(b'abc'))))
+        @modifiers.annotate(afile=converters.file(compression='auto'))
+        def func(afile):
+            with afile as f:
+                self.assertEqual('abc', f.read())
+            self.completed = True
+        o, e = self.crun(func, ['test', '-'], stdin=stdin)
+        self.assertFalse(e.getvalue())
+        self.assertTrue(self.completed)
+        self.assertTrue(stdin.closed)
+
+    def test_compression_stdout(self):
+        buf = BytesIO()
+        stdout = TextIOWrapper(buf)
+        opener = converters.file(
+            '-', mode='w', compression='bz2', keep_stdio_open=True)
+        orig = sys.stdout
+        sys.stdout = stdout
+        try:
+            with opener as f:
+                f.write('abc')
+        finally:
+            sys.stdout = orig
+        self.assertFalse(stdout.closed)
+        self.assertEqual(b'abc', bz2.decompress(buf.getvalue()))
+
+    def test_compression_unknown(self):
+        self.assertRaises(ValueError, converters.file, compression='zip')
+        self.assertRaises(
+            ValueError, converters.file, compression='gzip', mmap=True)
+
+
+    def test_binary_stdin(self):
+        stdin = TextIOWrapper(BytesIO(b'abc'))
+        @modifiers.annotate(afile=converters.file(mode='rb'))
+        def func(afile):
+            with afile as f:
+                self.assertIs(f, stdin.buffer)
+                self.assertEqual(b'abc', f.read())
+            self.completed = True
+        o, e = self.crun(func, ['test', '-'], stdin=stdin)
+        self.assertFalse(e.getvalue())
+        self.assertTrue(self.completed)
+        self.assertTrue(stdin.closed)
+
+    def test_binary_stdout_no_close(self):
+        buf = BytesIO()
+        stdout = TextIOWrapper(buf)
+        stdout.write('a')
+        opener = converters.file('-', mode='wb', keep_stdio_open=True)
+        orig = sys.stdout
+        sys.stdout = stdout
+        try:
+            with opener as f:
+                self.assertIs(f, stdout.buffer)
+                f.write(b'b')
+        finally:
+            sys.stdout = orig
+        self.assertFalse(stdout.closed)
+        self.assertEqual(b'ab', buf.getvalue())
+
+    def test_access_hints(self):
+        path = os.path.join(self.temp, 'afile')
+        with open(path, 'wb') as f:
+            f.write(b'abc' * 1000)
+        opener = converters.file(
+            path, mode='rb', buffering=1 << 20,
+            sequential=True, readahead=1 << 16)
+        with opener as f:
+            self.assertEqual(b'abc' * 1000, f.read())
+        opener = converters.file(
+            path, mmap=True, sequential=True, readahead=1 << 16)
+        with opener as data:
+            self.assertEqual(b'abc', data[:3])
+
+
+    def make_files(self, count):
+        paths = []
+        for i in range(count):
+            path = os.path.join(self.temp, 'file{0}'.format(i))
+            with open(path, 'w') as f:
+                f.write(str(i))
+            paths.append(path)
+        return paths
+
+    def test_prefetch(self):
+        @modifiers.annotate(inputs=converters.file())
+        def func(*inputs):
+            opened = []
+            with converters.prefetch(inputs, ahead=2) as files:
+                for f in files:
+                    for previous in opened:
+                        self.assertTrue(previous.closed)
+                    opened.append(f)
+                    print(f.read())
+            self.assertTrue(all(f.closed for f in opened))
+        o, e = self.crun(func, ['test'] + self.make_files(5))
+        self.assertEqual('0\n1\n2\n3\n4\n', o.getvalue())
+        self.assertFalse(e.getvalue())
+
+    def test_prefetch_break(self):
+        openers = [converters.file(path) for path in self.make_files(5)]
+        with converters.prefetch(openers, ahead=3) as files:
+            first = next(files)
+        self.assertTrue(first.closed)
+        for opener in openers[1:4]:
+            if hasattr(opener, 'f'):
+                self.assertTrue(opener.f.closed)
+
+    def test_prefetch_error(self):
+        paths = self.make_files(3)
+        openers = [converters.file(path) for path in paths]
+        os.remove(paths[1])
+        with self.assertRaises(errors.ArgumentError):
+            with converters.prefetch(openers) as files:
+                for f in files:
+                    pass
+        self.assertTrue(openers[0].f.closed)
+        if hasattr(openers[2], 'f'):
+            self.assertTrue(openers[2].f.closed)
+
+    def test_prefetch_empty(self):
+        with converters.prefetch([]) as files:
+            self.assertEqual([], list(files))
+        self.assertRaises(ValueError, converters.prefetch, [], ahead=0)
+
+
+    def test_batch_validation(self):
+        paths = self.make_files(40)
+        missing = os.path.join(self.temp, 'missing')
+        os.symlink(missing, os.path.join(self.temp, 'broken'))
+        @modifiers.annotate(inputs=converters.file(batch=True))
+        def func(*inputs):
+            self.assertEqual(paths, [opener.arg for opener in inputs])
+            self.completed = True
+        o, e = self.crun(func, ['test'] + paths)
+        self.assertFalse(e.getvalue())
+        self.assertTrue(self.completed)
+        for bad in (missing, os.path.join(self.temp, 'broken')):
+            o, e = self.crun(func, ['test'] + paths + [bad])
+            self.assertEqual(
+                'test: Bad value for inputs: File does not exist: {0!r}'
+                .format(bad), e.getvalue().splitlines()[0])
+
+    def test_batch_validation_write(self):
+        paths = [os.path.join(self.temp, 'out{0}'.format(i))
+                 for i in range(20)]
+        nodir = os.path.join(self.temp, 'nodir', 'out')
+        @modifiers.annotate(outputs=converters.file(mode='w', batch=True))
+        def func(*outputs):
+            self.completed = True
+        o, e = self.crun(func, ['test'] + paths)
+        self.assertFalse(e.getvalue())
+        self.assertTrue(self.completed)
+        o, e = self.crun(func, ['test'] + paths + [nodir])
+        self.assertEqual(
+            'test: Bad value for outputs: Directory does not exist: {0!r}'
+            .format(nodir), e.getvalue().splitlines()[0])
+
+
+    def test_atomic(self):
+        path = os.path.join(self.temp, 'afile')
+        with open(path, 'w') as f:
+            f.write('old')
+        os.chmod(path, 0o640)
+        @modifiers.annotate(afile=converters.file(mode='w', atomic=True))
+        def func(afile):
+            with afile as f:
+                f.write('new')
+                f.flush()
+                with open(path) as current:
+                    self.assertEqual('old', current.read())
+                self.assertEqual(2, len(os.listdir(self.temp)))
+            self.completed = True
+        o, e = self.crun(func, ['test', path])
+        self.assertFalse(e.getvalue())
+        self.assertTrue(self.completed)
+        self.assertEqual(['afile'], os.listdir(self.temp))
+        with open(path) as f:
+            self.assertEqual('new', f.read())
+        self.assertEqual(0o640, stat.S_IMODE(os.stat(path).st_mode))
+
+    def test_atomic_error(self):
+        path = os.path.join(self.temp, 'afile')
+        with open(path, 'w') as f:
+            f.write('old')
+        with self.assertRaises(ZeroDivisionError):
+            with converters.file(path, mode='w', atomic=True) as f:
+                f.write('new')
+                1 / 0
+        self.assertEqual(['afile'], os.listdir(self.temp))
+        with open(path) as f:
+            self.assertEqual('old', f.read())
+
+    def test_atomic_compressed(self):
+        path = os.path.join(self.temp, 'afile.gz')
+        opener = converters.file(
+            path, mode='wb', atomic=True, compression='auto')
+        with opener as f:
+            f.write(b'abc')
+        self.assertEqual(['afile.gz'], os.listdir(self.temp))
+        with gzip.open(path) as f:
+            self.assertEqual(b'abc', f.read())
+
+    def test_atomic_bad_mode(self):
+        self.assertRaises(ValueError, converters.file, atomic=True)
+        self.assertRaises(
+            ValueError, converters.file, mode='a', atomic=True)
+
+
 class ConverterErrorTests(Fixtures):
     def _test(self, conv, inp):
         sig = support.s('*, par: c', globals={'c': conv})
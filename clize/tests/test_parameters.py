@@ -2,10 +2,12 @@
 # Copyright (C) 2011-2022 by Yann Kaiser and contributors. See AUTHORS and
 # COPYING for details.
 
+import io
+
 from sigtools import support, modifiers
 
 from clize import parser, errors, Parameter, runner, parameters
-from clize.tests.util import SignatureFixtures, FunctionFixtures
+from clize.tests.util import SignatureFixtures, FunctionFixtures, Tests
 
 
 def _test_annotated_signature(self, sig_info, in_args, args, kwargs, *, make_signature):
@@ -718,3 +720,82 @@ class PnErrorTests(SignatureFixtures):
             self.read_arguments(csig, ('bad',))
         except errors.BadArgumentFormat as exc:
             self.assertEqual(exc.param.display_name, 'other')
+
+
+class FromStdinTests(Tests):
+    def run_stdin(self, func, args, data):
+        stdin = io.TextIOWrapper(io.BytesIO(data))
+        return self.crun(func, ['test'] + args, stdin=stdin)
+
+    def test_rep(self):
+        sig = support.s('*args: a', globals={'a': parameters.from_stdin()})
+        csig = parser.CliSignature.from_signature(sig)
+        self.assertEqual('[--args-from-stdin] [args...]', str(csig))
+
+    def test_dash(self):
+        def func(first, *rest: parameters.from_stdin()):
+            return repr((first, rest))
+        out, err = self.run_stdin(func, ['a', 'b', '-'], b'c\nd e\n')
+        self.assertEqual("('a', ('b', 'c', 'd e'))\n", out.getvalue())
+        self.assertEqual('', err.getvalue())
+
+    def test_option(self):
+        nul_separated = parameters.from_stdin(sep='\0')
+        def func(*args: nul_separated):
+            return repr(args)
+        out, err = self.run_stdin(func, ['--args-from-stdin'], b'a\nb\0c')
+        self.assertEqual("('a\\nb', 'c')\n", out.getvalue())
+
+    def test_text_stdin(self):
+        def func(*args: parameters.from_stdin()):
+            return repr(args)
+        out, err = self.crun(func, ['test', '-'], stdin=io.StringIO('a\nb'))
+        self.assertEqual("('a', 'b')\n", out.getvalue())
+
+    def test_not_requested(self):
+        def func(*args: parameters.from_stdin()):
+            return repr(args)
+        out, err = self.run_stdin(func, ['a'], b'b\n')
+        self.assertEqual("('a',)\n", out.getvalue())
+
+    def test_disabled_triggers(self):
+        def func(*args: parameters.from_stdin(stdio=None, option=None)):
+            return repr(args)
+        out, err = self.run_stdin(func, ['-'], b'b\n')
+        self.assertEqual("('-',)\n", out.getvalue())
+
+    def test_required(self):
+        def func(*args: (parameters.from_stdin(), Parameter.REQUIRED)):
+            return repr(args)
+        out, err = self.run_stdin(func, ['-'], b'b\n')
+        self.assertEqual("('b',)\n", out.getvalue())
+        out, err = self.run_stdin(func, [], b'b\n')
+        self.assertTrue(err.getvalue().startswith(
+            'test: Missing required arguments: args'))
+
+    def test_lazy(self):
+        ba = self.read_arguments(
+            parser.CliSignature.from_signature(
+                support.s('*args: a', globals={'a': parameters.from_stdin()})),
+            ['-'])
+        self.assertEqual([], ba.args)
+        self.assertIsNotNone(ba.lazy_args)
+
+    def test_conversion_error(self):
+        def func(*args: (parameters.from_stdin(), int)):
+            raise NotImplementedError
+        out, err = self.run_stdin(func, ['-'], b'1\nx\n')
+        self.assertTrue(err.getvalue().startswith(
+            "test: Bad value for args: 'x'"), err.getvalue())
+
+    def test_help(self):
+        def func(*args: parameters.from_stdin()):
+            """
+            :param args: values
+            """
+        help = ' '.join(runner.Clize.get_cli(func)('func', '--help').split())
+        self.assertIn('Usage: func [OPTIONS] [args...]', help)
+        self.assertIn('use "-" to read values from the standard input', help)
+        self.assertIn(
+            '--args-from-stdin Read values for args from the standard input.',
+            help)
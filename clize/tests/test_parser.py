@@ -1,10 +1,15 @@
 # clize -- A command-line argument parser for Python
 # Copyright (C) 2011-2022 by Yann Kaiser and contributors. See AUTHORS and
 # COPYING for details.
+import asyncio
 import functools
+import gc
 import inspect
 import os
 import pathlib
+import shutil
+import tempfile
+import threading
 import typing
 import warnings
 
@@ -13,7 +18,7 @@ from repeated_test import evaluated, options
 from sigtools import support, modifiers, specifiers
 
 from clize import parser, errors, util, Clize, Parameter
-from clize.tests.util import Fixtures, SignatureFixtures
+from clize.tests.util import Fixtures, SignatureFixtures, Tests
 
 
 _ic = parser._implicit_converters
@@ -832,3 +837,249 @@ class BadSigTests(Fixtures):
         self.assertRaises(ValueError, parser.CliSignature.from_signature, sig)
 
     alias_overlapping = '*, one: "a", two: "a"',
+
+
+class ResponseFileTests(Tests):
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp)
+
+    def write(self, content, name='args'):
+        path = os.path.join(self.temp, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_lines(self):
+        path = self.write(b'one\ntwo words\r\n\nthree')
+        self.assertEqual(
+            ['one', 'two words', '', 'three'],
+            list(parser.read_response_file(path)))
+
+    def test_nul(self):
+        path = self.write(b'a\nb\0c d\0')
+        self.assertEqual(
+            ['a\nb', 'c d'], list(parser.read_response_file(path, 'nul')))
+
+    def test_shell(self):
+        path = self.write(b'one "two words"\n  \'three\'\n')
+        self.assertEqual(
+            ['one', 'two words', 'three'],
+            list(parser.read_response_file(path, 'shell')))
+
+    def test_empty(self):
+        path = self.write(b'')
+        self.assertEqual([], list(parser.read_response_file(path)))
+
+    def test_missing(self):
+        path = os.path.join(self.temp, 'missing')
+        with self.assertRaises(errors.ArgumentError) as cm:
+            list(parser.read_response_file(path))
+        self.assertIn(repr(path), cm.exception.message)
+
+    def test_bad_quoting(self):
+        path = self.write(b'"unclosed')
+        with self.assertRaises(errors.ArgumentError):
+            list(parser.read_response_file(path, 'shell'))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            list(parser.read_response_file('x', 'json'))
+
+    def test_expand(self):
+        path = self.write(b'b\nc\n')
+        self.assertEqual(
+            ['a', 'b', 'c', '@', 'd'],
+            list(parser.expand_response_files(['a', '@' + path, '@', 'd'])))
+
+
+class AsyncConverterTests(Tests):
+    def setUp(self):
+        self.running = 0
+        self.most_running = 0
+
+        @parser.value_converter(name='VAL')
+        async def conv(arg):
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+            await asyncio.sleep(0.01)
+            self.running -= 1
+            if arg == 'bad':
+                raise ValueError(arg)
+            return arg.upper()
+        self.conv = conv
+
+    def sig(self, sig_str, **kwargs):
+        return parser.CliSignature.from_signature(
+            support.s(sig_str, locals={'conv': self.conv}), **kwargs)
+
+    def test_positional_and_named(self):
+        sig = self.sig('a: conv, *args: conv, b: conv, c=None')
+        ba = self.read_arguments(sig, ['x', 'y', 'z', '-b', 'w', '-c', 'v'])
+        self.assertEqual(['X', 'Y', 'Z'], ba.args)
+        self.assertEqual({'b': 'W', 'c': 'v'}, ba.kwargs)
+        self.assertEqual(4, self.most_running)
+
+    def test_error(self):
+        sig = self.sig('a: conv, b: conv')
+        with self.assertRaises(errors.BadArgumentFormat) as cm:
+            self.read_arguments(sig, ['x', 'bad'])
+        self.assertEqual('b', cm.exception.param.display_name)
+        self.assertIn("Bad value for b: 'bad'", str(cm.exception))
+
+    def test_multi(self):
+        from clize.parameters import multi
+        sig = parser.CliSignature.from_signature(support.s(
+            '*, opt: ann', locals={'ann': (self.conv, multi())}))
+        ba = self.read_arguments(sig, ['--opt', 'a', '--opt', 'b'])
+        self.assertEqual({'opt': ['A', 'B']}, ba.kwargs)
+        self.assertEqual(2, self.most_running)
+
+    def test_later_error_discards(self):
+        sig = self.sig('a: conv, b: int')
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            with self.assertRaises(errors.BadArgumentFormat):
+                self.read_arguments(sig, ['x', 'y'])
+            gc.collect()
+        self.assertEqual([], w)
+        self.assertEqual(0, self.most_running)
+
+    def test_sync_context(self):
+        sig = self.sig('*, opt: conv')
+        param = sig.aliases['--opt']
+        self.assertEqual('A', param.coerce_value('a', object()))
+
+    def test_running_loop(self):
+        sig = self.sig('a: conv, b: conv')
+        async def main():
+            return self.read_arguments(sig, ['x', 'y'])
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            ba = asyncio.run(main())
+            gc.collect()
+        self.assertEqual([], w)
+        self.assertEqual(['X', 'Y'], ba.args)
+        self.assertEqual(2, self.most_running)
+
+    def test_running_loop_sync_context(self):
+        sig = self.sig('*, opt: conv')
+        param = sig.aliases['--opt']
+        async def main():
+            return param.coerce_value('a', object())
+        self.assertEqual('A', asyncio.run(main()))
+
+
+class ThreadedConversionTests(Tests):
+    def sig(self, sig_str, **kwargs):
+        return parser.CliSignature.from_signature(
+            support.s(sig_str, locals=kwargs))
+
+    def test_concurrent(self):
+        barrier = threading.Barrier(3, timeout=5)
+        @parser.value_converter(name='VAL')
+        def conv(arg):
+            barrier.wait()
+            return arg.upper()
+        sig = self.sig('a: conv, *args: conv, b: conv, c=None', conv=conv)
+        ba = sig.read_arguments(
+            ['x', 'y', '-b', 'z', '-c', 'w'], 'test', conversion_workers=3)
+        self.assertEqual(['X', 'Y'], ba.args)
+        self.assertEqual({'b': 'Z', 'c': 'w'}, ba.kwargs)
+
+    def test_default(self):
+        sig = self.sig('a: ann=2', ann=(int, Parameter.cli_default('1')))
+        ba = sig.read_arguments([], 'test', conversion_workers=2)
+        self.assertEqual([1], ba.args)
+
+    def test_error(self):
+        sig = self.sig('a: int, b: int')
+        with self.assertRaises(errors.BadArgumentFormat) as cm:
+            sig.read_arguments(['1', 'x'], 'test', conversion_workers=2)
+        self.assertEqual('b', cm.exception.param.display_name)
+        self.assertIn("Bad value for b: 'x'", str(cm.exception))
+
+    def test_with_async(self):
+        @parser.value_converter(name='VAL')
+        async def aconv(arg):
+            return arg.upper()
+        sig = self.sig('a: aconv, b: int', aconv=aconv)
+        ba = sig.read_arguments(['x', '2'], 'test', conversion_workers=2)
+        self.assertEqual(['X', 2], ba.args)
+
+    def test_clize(self):
+        def func(*args: int):
+            return sum(args)
+        cli = Clize(func, conversion_workers=2)
+        self.assertEqual(6, cli('test', '1', '2', '3'))
+        with self.assertRaises(ValueError):
+            Clize(func, conversion_workers=0)
+
+    def test_subcommand(self):
+        barrier = threading.Barrier(2, timeout=5)
+        @parser.value_converter(name='VAL')
+        def conv(arg):
+            barrier.wait()
+            return arg.upper()
+        def func(*args: conv):
+            return args
+        def other():
+            raise NotImplementedError
+        cli = Clize.get_cli([func, other], conversion_workers=2)
+        self.assertEqual(('A', 'B'), cli('test', 'func', 'a', 'b'))
+
+
+class BatchConverterTests(Tests):
+    def setUp(self):
+        self.calls = []
+
+        def batch(args):
+            self.calls.append(args)
+            return [ValueError() if arg == 'bad' else arg.upper()
+                    for arg in args]
+
+        @parser.value_converter(name='VAL', batch=batch)
+        def conv(arg):
+            return batch([arg])[0]
+        self.sig = parser.CliSignature.from_signature(
+            support.s('a: conv, *args: conv, b: conv', locals={'conv': conv}))
+
+    def test_batch(self):
+        ba = self.read_arguments(self.sig, ['x', 'y', '-b', 'z'])
+        self.assertEqual(['X', 'Y'], ba.args)
+        self.assertEqual({'b': 'Z'}, ba.kwargs)
+        self.assertEqual([['x', 'y', 'z']], self.calls)
+
+    def test_error(self):
+        with self.assertRaises(errors.BadArgumentFormat) as cm:
+            self.read_arguments(self.sig, ['x', 'y', '-b', 'bad'])
+        self.assertEqual('-b', cm.exception.param.display_name)
+        self.assertIn("Bad value for -b: 'bad'", str(cm.exception))
+
+    def test_error_before_later_error(self):
+        with self.assertRaises(errors.BadArgumentFormat) as cm:
+            self.read_arguments(self.sig, ['x', 'bad', '--unknown'])
+        self.assertIn("Bad value for args: 'bad'", str(cm.exception))
+        with self.assertRaises(errors.BadArgumentFormat) as cm:
+            self.read_arguments(self.sig, ['bad'])
+        self.assertIn("Bad value for a: 'bad'", str(cm.exception))
+
+    def test_later_error(self):
+        with self.assertRaises(errors.UnknownOption):
+            self.read_arguments(self.sig, ['x', '--unknown'])
+
+    def test_overridden_coerce_value(self):
+        values = []
+        class Param(parser.PositionalParameter):
+            def coerce_value(self, arg, ba):
+                ret = super(Param, self).coerce_value(arg, ba)
+                values.append(ret)
+                return ret
+        sig = parser.CliSignature.from_signature(support.s(
+            'a: ann', locals={'ann': (
+                self.sig.positional[0].conv,
+                parser.use_class(name='param', pos=Param))}))
+        ba = self.read_arguments(sig, ['x'])
+        self.assertEqual(['X'], values)
+        self.assertEqual(['X'], ba.args)
+        self.assertEqual([['x']], self.calls)
@@ -2,15 +2,21 @@
 # Copyright (C) 2011-2022 by Yann Kaiser and contributors. See AUTHORS and
 # COPYING for details.
 
+import asyncio
+import dataclasses
+import os
 import pathlib
 import sys
+import tempfile
+import time
 import unittest
-from io import StringIO
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO, StringIO, TextIOWrapper
 
 import repeated_test
 from repeated_test import options
 
-from clize import runner, errors
+from clize import runner, errors, parameters, parser
 from clize.tests.util import Fixtures, Tests
 
 
@@ -392,6 +398,11 @@ class GetCliTests(unittest.TestCase):
         obj = object()
         self.assertRaises(TypeError, runner.Clize.get_cli, obj)
 
+
+def _double(*args):
+    return ' '.join(str(int(arg) * 2) for arg in args)
+
+
 class RunnerTests(Tests):
     def test_subcommand(self):
         def func1(x):
@@ -610,3 +621,812 @@ class RunnerTests(Tests):
         out, err = self.crun(func, ['test'], catch=[MyError])
         self.assertEqual(out.getvalue(), '')
         self.assertEqual(err.getvalue(), 'test: test_catch_argerror_cust\n')
+
+    def test_response_files(self):
+        def func(*args):
+            return ' '.join(args)
+        with tempfile.TemporaryDirectory() as temp:
+            path = os.path.join(temp, 'args')
+            with open(path, 'w') as f:
+                f.write('b\nc d\n')
+            out, err = self.crun(func, ['test', 'a', '@' + path, 'e'],
+                                 response_files=True)
+        self.assertEqual(out.getvalue(), 'a b c d e\n')
+        self.assertEqual(err.getvalue(), '')
+
+    def test_response_files_disabled(self):
+        def func(*args):
+            return ' '.join(args)
+        out, err = self.crun(func, ['test', '@nonexistent'])
+        self.assertEqual(out.getvalue(), '@nonexistent\n')
+
+    def test_response_files_missing(self):
+        def func(*args):
+            raise NotImplementedError
+        out, err = self.crun(func, ['test', '@nonexistent'],
+                             response_files='shell')
+        self.assertEqual(out.getvalue(), '')
+        self.assertTrue(err.getvalue().startswith(
+            "test: No such file or directory: 'nonexistent'"))
+
+    def test_response_files_bad_format(self):
+        def func():
+            raise NotImplementedError
+        self.assertRaises(ValueError, runner.Clize, func, response_files='xml')
+
+    def test_chunk_size(self):
+        def func(prefix, *args, sep='-'):
+            return prefix + sep.join(args)
+        out, err = self.crun(
+            func, ['test', 'p:', 'a', 'b', 'c', 'd', 'e', '--sep=+'],
+            chunk_size=2)
+        self.assertEqual(out.getvalue(), 'p:a+b\np:c+d\np:e\n')
+        self.assertEqual(err.getvalue(), '')
+
+    def test_chunk_size_no_args(self):
+        def func(*args):
+            return repr(args)
+        out, err = self.crun(func, ['test'], chunk_size=2)
+        self.assertEqual(out.getvalue(), '()\n')
+
+    def test_chunk_size_none_result(self):
+        calls = []
+        def func(*args):
+            calls.append(args)
+        out, err = self.crun(func, ['test', 'a', 'b', 'c'], chunk_size=2)
+        self.assertEqual(calls, [('a', 'b'), ('c',)])
+        self.assertEqual(out.getvalue(), '')
+
+    def test_chunk_size_no_varargs(self):
+        def func(a):
+            return a
+        self.assertEqual(runner.Clize(func, chunk_size=2)('test', 'x'), 'x')
+
+    def test_chunk_size_alt(self):
+        def func(*args):
+            raise NotImplementedError
+        out, err = self.crun(func, ['test', '--help'], chunk_size=2)
+        self.assertTrue(out.getvalue().startswith('Usage: test [args...]'))
+
+    def test_chunk_size_error(self):
+        def func(*args):
+            if 'bad' in args:
+                raise errors.UserError('bad chunk')
+            return ' '.join(args)
+        out, err = self.crun(func, ['test', 'a', 'bad', 'c'], chunk_size=1)
+        self.assertEqual(out.getvalue(), 'a\n')
+        self.assertEqual(err.getvalue(), 'test: bad chunk\n')
+
+    def test_chunk_size_stdin(self):
+        read = []
+        converted = []
+        @parser.value_converter
+        def conv(arg):
+            converted.append(arg)
+            return arg
+        def func(*args: (parameters.from_stdin(), conv)):
+            read.append((args, len(converted)))
+            return len(args)
+        stdin = StringIO(''.join('{0}\n'.format(i) for i in range(5)))
+        out, err = self.crun(func, ['test', '-'], stdin=stdin, chunk_size=2)
+        self.assertEqual(out.getvalue(), '2\n2\n1\n')
+        self.assertEqual(
+            read, [(('0', '1'), 2), (('2', '3'), 4), (('4',), 5)])
+
+    def test_chunk_size_subcommand(self):
+        calls = []
+        def proc(*args, opt=''):
+            calls.append((args, opt))
+            return ' '.join(args)
+        def other():
+            raise NotImplementedError
+        out, err = self.crun([proc, other],
+                             ['test', 'proc', '--opt', 'x', 'a', 'b', 'c'],
+                             chunk_size=2)
+        self.assertEqual(out.getvalue(), 'a b\nc\n')
+        self.assertEqual(calls, [(('a', 'b'), 'x'), (('c',), 'x')])
+
+    def test_workers_subcommand(self):
+        def proc(*args, opt=''):
+            return opt + ''.join(args)
+        def other():
+            raise NotImplementedError
+        out, err = self.crun([proc, other],
+                             ['test', 'proc', '--opt', 'x', 'a', 'b'],
+                             workers=2)
+        self.assertEqual(out.getvalue(), 'xa\nxb\n')
+        self.assertEqual(err.getvalue(), '')
+
+    def test_chunk_size_invalid(self):
+        def func(*args):
+            raise NotImplementedError
+        self.assertRaises(ValueError, runner.Clize, func, chunk_size=0)
+
+    def test_workers_ordered(self):
+        def func(*args):
+            time.sleep(0.01 * (5 - int(args[0])))
+            return args[0]
+        out, err = self.crun(func, ['test', '1', '2', '3', '4'], workers=4)
+        self.assertEqual(out.getvalue(), '1\n2\n3\n4\n')
+        self.assertEqual(err.getvalue(), '')
+
+    def test_workers_chunk_size(self):
+        def func(prefix, *args):
+            return prefix + ''.join(args)
+        out, err = self.crun(
+            func, ['test', '>', 'a', 'b', 'c', 'd', 'e'],
+            workers=2, chunk_size=2)
+        self.assertEqual(out.getvalue(), '>ab\n>cd\n>e\n')
+
+    def test_workers_fail_fast(self):
+        def func(*args):
+            if args[0] == 'bad':
+                raise errors.UserError('failed on bad')
+            return args[0]
+        out, err = self.crun(
+            func, ['test', 'a', 'bad', 'c', 'bad'], workers=1)
+        self.assertEqual(out.getvalue(), 'a\n')
+        self.assertEqual(err.getvalue(), 'test: failed on bad\n')
+
+    def test_workers_collect_errors(self):
+        def func(*args):
+            if args[0].startswith('bad'):
+                raise errors.UserError('failed on ' + args[0])
+            return args[0]
+        out, err = self.crun(
+            func, ['test', 'a', 'bad1', 'c', 'bad2'],
+            workers=2, fail_fast=False)
+        self.assertEqual(out.getvalue(), 'a\nc\n')
+        self.assertEqual(
+            err.getvalue(), 'test: failed on bad1\ntest: failed on bad2\n')
+
+    def test_workers_collect_single_error(self):
+        def func(*args):
+            if args[0] == 'bad':
+                raise errors.UserError('failed')
+            return args[0]
+        out, err = self.crun(
+            func, ['test', 'bad', 'b'], workers=2, fail_fast=False)
+        self.assertEqual(out.getvalue(), 'b\n')
+        self.assertEqual(err.getvalue(), 'test: failed\n')
+
+    def test_workers_process_pool(self):
+        out, err = self.crun(
+            _double, ['test', '1', '2', '3'],
+            workers=2, executor=ProcessPoolExecutor)
+        self.assertEqual(out.getvalue(), '2\n4\n6\n')
+
+    def test_workers_invalid(self):
+        def func(*args):
+            raise NotImplementedError
+        self.assertRaises(ValueError, runner.Clize, func, workers=0)
+
+    def test_coroutine_function(self):
+        async def func(a, *, b=''):
+            await asyncio.sleep(0)
+            return a + b
+        out, err = self.crun(func, ['test', 'x', '-b', 'y'])
+        self.assertEqual(out.getvalue(), 'xy\n')
+        self.assertEqual(err.getvalue(), '')
+
+    def test_coroutine_function_error(self):
+        async def func():
+            raise errors.UserError('async failure')
+        out, err = self.crun(func, ['test'])
+        self.assertEqual(out.getvalue(), '')
+        self.assertEqual(err.getvalue(), 'test: async failure\n')
+
+    def test_coroutine_subcommand(self):
+        async def func():
+            return 'from sub'
+        out, err = self.crun([func], ['test', 'func'])
+        self.assertEqual(out.getvalue(), 'from sub\n')
+
+    def test_coroutine_loop_factory(self):
+        loops = []
+        def loop_factory():
+            loop = asyncio.new_event_loop()
+            loops.append(loop)
+            return loop
+        async def func():
+            return asyncio.get_running_loop() is loops[0]
+        out, err = self.crun(func, ['test'], loop_factory=loop_factory)
+        self.assertEqual(out.getvalue(), 'True\n')
+        self.assertTrue(loops[0].is_closed())
+
+    def test_coroutine_loop_factory_subcommand(self):
+        loops = []
+        def loop_factory():
+            loops.append(asyncio.new_event_loop())
+            return loops[-1]
+        async def func():
+            return asyncio.get_running_loop() is loops[0]
+        def other():
+            raise NotImplementedError
+        out, err = self.crun([func, other], ['test', 'func'],
+                             loop_factory=loop_factory)
+        self.assertEqual(out.getvalue(), 'True\n')
+        self.assertEqual(len(loops), 1)
+
+    def test_coroutine_chunks(self):
+        async def func(*args):
+            return ''.join(args)
+        out, err = self.crun(
+            func, ['test', 'a', 'b', 'c'], chunk_size=2, workers=2)
+        self.assertEqual(out.getvalue(), 'ab\nc\n')
+
+    def test_run_coroutine_passthrough(self):
+        self.assertEqual(runner.run_coroutine(1), 1)
+
+    def test_coroutine_running_loop(self):
+        async def func(a):
+            await asyncio.sleep(0)
+            return asyncio.get_running_loop(), a
+        cli = runner.Clize.get_cli(func)
+        async def main():
+            return asyncio.get_running_loop(), await cli('test', 'x')
+        outer, (inner, value) = asyncio.run(main())
+        self.assertIs(outer, inner)
+        self.assertEqual(value, 'x')
+
+    def test_stream_generator(self):
+        produced = []
+        def func(count: int):
+            for i in range(count):
+                produced.append(i)
+                yield i
+        out, err = self.crun(func, ['test', '3'])
+        self.assertEqual(out.getvalue(), '0\n1\n2\n')
+        self.assertEqual(produced, [0, 1, 2])
+
+    def test_stream_end(self):
+        def func():
+            return iter(['a', None, 'b'])
+        out, err = self.crun(func, ['test'], end='\0')
+        self.assertEqual(out.getvalue(), 'a\0b\0')
+
+    def test_stream_list_unchanged(self):
+        def func():
+            return ['a', 'b']
+        out, err = self.crun(func, ['test'])
+        self.assertEqual(out.getvalue(), "['a', 'b']\n")
+
+    def test_stream_error(self):
+        def func():
+            yield 'a'
+            raise errors.UserError('oops')
+        out, err = self.crun(func, ['test'])
+        self.assertEqual(out.getvalue(), 'a\n')
+        self.assertEqual(err.getvalue(), 'test: oops\n')
+
+    def test_stream_broken_pipe(self):
+        closed = []
+        class ClosedOut(object):
+            def write(self, s):
+                raise BrokenPipeError
+            def flush(self):
+                pass
+        def func():
+            try:
+                while True:
+                    yield 'a'
+            finally:
+                closed.append(True)
+        with self.assertRaises(SystemExit) as cm:
+            runner.run(func, args=['test'], out=ClosedOut(), err=StringIO())
+        self.assertEqual(cm.exception.code, 1)
+        self.assertEqual(closed, [True])
+
+    def test_command_broken_pipe(self):
+        def func():
+            raise BrokenPipeError('from a socket')
+        with self.assertRaises(BrokenPipeError):
+            self.crun(func, ['test'])
+
+    def test_stream_command_broken_pipe(self):
+        def func():
+            yield 'a'
+            raise BrokenPipeError('from a subprocess')
+        out = StringIO()
+        with self.assertRaises(BrokenPipeError):
+            runner.run(func, args=['test'], out=out, exit=False)
+        self.assertEqual(out.getvalue(), 'a\n')
+
+    def test_output_format_broken_pipe(self):
+        class ClosedOut(object):
+            def write(self, s):
+                raise BrokenPipeError
+            def flush(self):
+                raise BrokenPipeError
+        def func():
+            return [{'a': 1}]
+        with self.assertRaises(SystemExit) as cm:
+            runner.run(func, args=['test'], out=ClosedOut(), err=StringIO(),
+                       output_format='jsonl')
+        self.assertEqual(cm.exception.code, 1)
+
+    def test_bytes_result(self):
+        def func():
+            return b'\xff\x00'
+        buf = BytesIO()
+        out = TextIOWrapper(buf)
+        runner.run(func, args=['test'], exit=False, out=out, err=StringIO())
+        self.assertEqual(buf.getvalue(), b'\xff\x00')
+
+    def test_bytes_stream(self):
+        def func():
+            yield 'text'
+            yield bytearray(b'ab')
+            yield memoryview(b'cd')
+            yield 'more'
+        buf = BytesIO()
+        out = TextIOWrapper(buf)
+        runner.run(func, args=['test'], exit=False, out=out, err=StringIO())
+        self.assertEqual(buf.getvalue(), b'text\nabcdmore\n')
+
+    def test_bytes_binary_out(self):
+        def func():
+            return iter([b'a', b'b'])
+        out = BytesIO()
+        runner.run(func, args=['test'], exit=False, out=out, err=StringIO())
+        self.assertEqual(out.getvalue(), b'ab')
+
+    def test_bytes_text_only_out(self):
+        def func():
+            return b'a'
+        out, err = self.crun(func, ['test'])
+        self.assertEqual(out.getvalue(), "b'a'\n")
+
+    def test_output_jsonl(self):
+        @dataclasses.dataclass
+        class Point:
+            x: int
+            y: int
+        def func():
+            yield {'a': 1}
+            yield Point(1, 2)
+            yield [Point(3, 4)]
+        out, err = self.crun(func, ['test'], output_format='jsonl')
+        self.assertEqual(
+            out.getvalue(),
+            '{"a": 1}\n{"x": 1, "y": 2}\n[{"x": 3, "y": 4}]\n')
+
+    def test_output_csv(self):
+        def func():
+            return [{'a': 1, 'b': 'x,y'}, {'a': 2, 'b': 'z'}]
+        out, err = self.crun(func, ['test'], output_format='csv')
+        self.assertEqual(out.getvalue(), 'a,b\r\n1,"x,y"\r\n2,z\r\n')
+
+    def test_output_csv_rows(self):
+        def func():
+            return iter([(1, 2), (3, 4)])
+        out, err = self.crun(func, ['test'], output_format='csv')
+        self.assertEqual(out.getvalue(), '1,2\r\n3,4\r\n')
+
+    def test_output_csv_missing_key(self):
+        def func():
+            return [{'a': 1, 'b': 2}, {'a': 3}]
+        out, err = self.crun(func, ['test'], output_format='csv')
+        self.assertEqual(out.getvalue(), 'a,b\r\n1,2\r\n3,\r\n')
+
+    def test_output_csv_extra_key(self):
+        def func():
+            return [{'a': 1}, {'a': 2, 'b': 3, 'c': 4}]
+        out, err = self.crun(func, ['test'], output_format='csv')
+        self.assertEqual(out.getvalue(), 'a\r\n1\r\n')
+        self.assertEqual(
+            err.getvalue(),
+            'test: Cannot write record 2 as CSV: b, c not in the header\n')
+
+    def test_output_csv_mixed_records(self):
+        def func():
+            return [{'a': 1}, (2,)]
+        out, err = self.crun(func, ['test'], output_format='csv')
+        self.assertEqual(out.getvalue(), 'a\r\n1\r\n')
+        self.assertEqual(
+            err.getvalue(),
+            'test: Cannot write record 2 as CSV: expected a dictionary '
+            'like the first record\n')
+        def func():
+            return [(1,), {'a': 2}]
+        out, err = self.crun(func, ['test'], output_format='csv')
+        self.assertEqual(out.getvalue(), '1\r\n')
+        self.assertEqual(
+            err.getvalue(),
+            'test: Cannot write record 2 as CSV: expected a sequence of '
+            'values like the first record\n')
+
+    def test_output_single_record(self):
+        def func():
+            return {'a': 1}
+        out, err = self.crun(func, ['test'], output_format='jsonl')
+        self.assertEqual(out.getvalue(), '{"a": 1}\n')
+
+    def test_output_help_unchanged(self):
+        def func():
+            raise NotImplementedError
+        out, err = self.crun(func, ['test', '--help'], output_format='jsonl')
+        self.assertTrue(out.getvalue().startswith('Usage: test'))
+
+    def test_output_custom(self):
+        def func():
+            return iter([1, 2])
+        def fmt(records, out):
+            out.write('+'.join(map(str, records)))
+        out, err = self.crun(func, ['test'], output_format=fmt)
+        self.assertEqual(out.getvalue(), '1+2')
+
+    def test_output_unknown(self):
+        with self.assertRaises(ValueError):
+            self.crun(lambda: None, ['test'], output_format='xml')
+
+    def test_output_buffered(self):
+        writes = []
+        class Out(StringIO):
+            def write(self, s):
+                writes.append(s)
+                return super().write(s)
+        def func():
+            return ({'i': i} for i in range(10000))
+        out = Out()
+        runner.run(func, args=['test'], exit=False, out=out, err=StringIO(),
+                   output_format='jsonl')
+        self.assertEqual(len(out.getvalue().splitlines()), 10000)
+        self.assertLess(len(writes), 10)
+
+    def run_script(self, source):
+        import subprocess
+        return subprocess.run(
+            [sys.executable, '-c', source], capture_output=True, text=True,
+            cwd=str(pathlib.Path(__file__).parents[2]))
+
+    def test_fast_exit(self):
+        proc = self.run_script(
+            'import atexit, sys\n'
+            'from clize import run\n'
+            'atexit.register(lambda: print("atexit"))\n'
+            'def main(): print("body", end=""); return "result"\n'
+            'try:\n'
+            '    run(main, args=["test"], fast_exit=True)\n'
+            'finally:\n'
+            '    print("finally")\n')
+        self.assertEqual(proc.returncode, 0)
+        self.assertEqual(proc.stdout, 'bodyresult\n')
+
+    def test_fast_exit_hooks(self):
+        proc = self.run_script(
+            'import atexit\n'
+            'from clize import run\n'
+            'atexit.register(lambda: print("atexit"))\n'
+            'def main(): return "result"\n'
+            'run(main, args=["test"], fast_exit=[lambda: print("hook")])\n')
+        self.assertEqual(proc.returncode, 0)
+        self.assertEqual(proc.stdout, 'result\nhook\n')
+
+    def test_fast_exit_error(self):
+        proc = self.run_script(
+            'from clize import run\n'
+            'def main(): pass\n'
+            'run(main, args=["test", "extra"], fast_exit=True)\n')
+        self.assertEqual(proc.returncode, 2)
+        self.assertIn('Received extra arguments: extra', proc.stderr)
+
+
+class BatchTests(Tests):
+    def setUp(self):
+        def add(a: int, b: int, *, negate=False):
+            return -(a + b) if negate else a + b
+        def fail():
+            raise errors.UserError('failed')
+        def count(n: int):
+            return iter(range(n))
+        self.commands = [add, fail, count]
+
+    def run_batch(self, lines, **kwargs):
+        out = StringIO()
+        err = StringIO()
+        statuses = runner.run_batch(
+            lines, self.commands, name='tool', out=out, err=err, **kwargs)
+        return statuses, out.getvalue(), err.getvalue()
+
+    def test_lines(self):
+        statuses, out, err = self.run_batch([
+            'add 1 2\n',
+            'add 3 4 --negate\n',
+            'count 3\n',
+        ])
+        self.assertEqual(statuses, [0, 0, 0])
+        self.assertEqual(out, '3\n-7\n0\n1\n2\n')
+        self.assertEqual(err, '')
+
+    def test_quoting(self):
+        def echo(*words):
+            return '|'.join(words)
+        out = StringIO()
+        statuses = runner.run_batch(
+            ['"a b" c\\ d \'e f\'\n'], echo, name='echo', out=out)
+        self.assertEqual(statuses, [0])
+        self.assertEqual(out.getvalue(), 'a b|c d|e f\n')
+
+    def test_errors(self):
+        statuses, out, err = self.run_batch([
+            'add 1\n',
+            'fail\n',
+            'add 1 2\n',
+            'add "1 2\n',
+            'unknown\n',
+        ])
+        self.assertEqual(statuses, [2, 1, 0, 2, 2])
+        self.assertEqual(out, '3\n')
+        lines = [
+            line for line in err.splitlines() if not line.startswith('Usage')]
+        self.assertTrue(lines[0].startswith('tool add: Missing required'))
+        self.assertEqual(lines[1], 'tool fail: failed')
+        self.assertTrue(lines[2].startswith('tool: line 4: '))
+        self.assertTrue(lines[3].startswith('tool: Unknown command'))
+
+    def test_skipped_lines(self):
+        statuses, out, err = self.run_batch([
+            '\n', '   \n', '# a comment\n', 'add 1 2 # inline comment\n'])
+        self.assertEqual(statuses, [0])
+        self.assertEqual(out, '3\n')
+
+    def test_lazy(self):
+        seen = []
+        def lines():
+            for line in ['1 2', '3 4']:
+                seen.append(line)
+                yield line
+        out = StringIO()
+        def check_lazy(a: int, b: int):
+            return len(seen)
+        runner.run_batch(lines(), check_lazy, name='tool', out=out)
+        self.assertEqual(out.getvalue(), '1\n2\n')
+
+    def test_reuses_cli(self):
+        cli = runner.Clize.get_cli(self.commands)
+        statuses = runner.run_batch(
+            ['add 1 2'], cli, name='tool', out=StringIO())
+        cmd = cli.owner.cmds_by_name['add']
+        signature = cmd.signature
+        statuses += runner.run_batch(
+            ['add 3 4'], cli, name='tool', out=StringIO())
+        self.assertEqual(statuses, [0, 0])
+        self.assertIs(cmd.signature, signature)
+
+    def test_output_format(self):
+        statuses, out, err = self.run_batch(
+            ['count 2', 'add 1 1'], output_format='jsonl')
+        self.assertEqual(out, '0\n1\n2\n')
+
+    def test_broken_pipe(self):
+        class Closed(StringIO):
+            def write(self, s):
+                raise BrokenPipeError
+        statuses = runner.run_batch(
+            ['add 1 2', 'add 3 4'], self.commands, name='tool', out=Closed())
+        self.assertEqual(statuses, [1])
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'os.fork is required')
+class ParallelBatchTests(Tests):
+    def setUp(self):
+        def sleep(seconds: float, *, label=''):
+            time.sleep(seconds)
+            return label or seconds
+        def fail():
+            raise errors.UserError('failed')
+        def pid():
+            return os.getpid()
+        def shout():
+            print('printed')
+            return 'returned'
+        def data():
+            return b'\x00\xff'
+        def die():
+            os._exit(5)
+        def exit():
+            sys.exit(4)
+        def wait(fd: int, *, label=''):
+            os.read(fd, 1)
+            return label
+        def signal(*fds: int):
+            for fd in fds:
+                os.write(fd, b'x')
+        self.commands = [
+            sleep, fail, pid, shout, data, die, exit, wait, signal]
+
+    def pipe(self):
+        read, write = os.pipe()
+        self.addCleanup(os.close, read)
+        self.addCleanup(os.close, write)
+        return read, write
+
+    def run_batch(self, lines, **kwargs):
+        out = StringIO()
+        err = StringIO()
+        statuses = runner.run_batch(
+            lines, self.commands, name='tool', out=out, err=err, **kwargs)
+        return statuses, out.getvalue(), err.getvalue()
+
+    def test_ordered(self):
+        read, write = self.pipe()
+        statuses, out, err = self.run_batch(
+            ['wait {0} --label=a'.format(read), 'sleep 0 --label=b', 'fail',
+             'signal {0}'.format(write)], jobs=4)
+        self.assertEqual(statuses, [0, 0, 1, 0])
+        self.assertEqual(out, 'a\nb\n')
+        self.assertEqual(err, 'tool fail: failed\n')
+
+    def test_unordered(self):
+        read, write = self.pipe()
+        class Output(StringIO):
+            def write(self, data):
+                ret = super(Output, self).write(data)
+                if data == 'b\n':
+                    os.write(write, b'x')
+                return ret
+        out = Output()
+        statuses = runner.run_batch(
+            ['wait {0} --label=a'.format(read), 'sleep 0 --label=b'],
+            self.commands, name='tool', out=out, jobs=2, ordered=False)
+        self.assertEqual(statuses, [0, 0])
+        self.assertEqual(out.getvalue(), 'b\na\n')
+
+    def test_concurrent(self):
+        read1, write1 = self.pipe()
+        read2, write2 = self.pipe()
+        statuses, out, err = self.run_batch(
+            ['signal {0}'.format(write1), 'wait {0}'.format(read2),
+             'wait {0}'.format(read1), 'signal {0}'.format(write2)],
+            jobs=4, timeout=10)
+        self.assertEqual(statuses, [0] * 4)
+
+    def test_bounded(self):
+        read, write = self.pipe()
+        statuses, out, err = self.run_batch(
+            ['wait {0}'.format(read), 'wait {0}'.format(read),
+             'signal {0} {0}'.format(write)], jobs=2, timeout=0.5)
+        self.assertEqual(statuses, [124, 124, 0])
+
+    def test_forked(self):
+        statuses, out, err = self.run_batch(['pid', 'pid'], jobs=2)
+        pids = out.split()
+        self.assertEqual(len(set(pids)), 2)
+        self.assertNotIn(str(os.getpid()), pids)
+
+    def test_timeout(self):
+        statuses, out, err = self.run_batch(
+            ['sleep 5', 'sleep 0 --label=done'], jobs=2, timeout=0.5)
+        self.assertEqual(statuses, [124, 0])
+        self.assertEqual(out, 'done\n')
+        self.assertEqual(err, 'tool: line 1: timed out after 0.5 seconds\n')
+
+    def test_timeout_sequential(self):
+        start = time.monotonic()
+        statuses, out, err = self.run_batch(
+            ['sleep 5', 'sleep 0 --label=done'], timeout=0.3)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(statuses, [124, 0])
+
+    def test_parse_error(self):
+        statuses, out, err = self.run_batch(
+            ['sleep 0.1', 'sleep "0', '', 'sleep 0 --label=x'], jobs=2)
+        self.assertEqual(statuses, [0, 2, 0])
+        self.assertEqual(out, '0.1\nx\n')
+        self.assertTrue(err.startswith('tool: line 2: '))
+
+    def test_captures_print(self):
+        orig = sys.stdout
+        sys.stdout = out = StringIO()
+        try:
+            statuses = runner.run_batch(
+                ['shout', 'shout'], self.commands, name='tool', jobs=2)
+        finally:
+            sys.stdout = orig
+        self.assertEqual(statuses, [0, 0])
+        self.assertEqual(out.getvalue(), 'printed\nreturned\n' * 2)
+
+    def test_binary(self):
+        buffer = BytesIO()
+        out = TextIOWrapper(buffer, encoding='utf-8')
+        statuses = runner.run_batch(
+            ['data', 'data'], self.commands, name='tool', out=out, jobs=2)
+        self.assertEqual(statuses, [0, 0])
+        self.assertEqual(buffer.getvalue(), b'\x00\xff' * 2)
+
+    def test_unexpected_exit(self):
+        statuses, out, err = self.run_batch(['die', 'exit'], jobs=2)
+        self.assertEqual(statuses, [1, 4])
+        self.assertEqual(
+            err, 'tool: line 1: the command exited unexpectedly\n')
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            runner.run_batch([], self.commands, jobs=0)
+        with self.assertRaises(ValueError):
+            runner.run_batch([], self.commands, timeout=0)
+
+
+class PipelineTests(Tests):
+    def setUp(self):
+        self.consumed = consumed = []
+        def numbers(count: int):
+            for i in range(count):
+                consumed.append(i)
+                yield i
+        def scale(values: parameters.pipeline_input, *, factor: int=2):
+            for value in values:
+                yield value * factor
+        def total(values: parameters.pipeline_input):
+            return sum(values)
+        def show(value: parameters.pipeline_input, *, prefix=''):
+            return '{0}{1!r}'.format(prefix, value)
+        self.commands = [numbers, scale, total, show]
+
+    def run_pipeline(self, args):
+        return self.crun(self.commands, ['tool'] + args,
+                         pipeline_separator=':::')
+
+    def test_pipeline(self):
+        out, err = self.run_pipeline(
+            ['numbers', '4', ':::', 'scale', '--factor', '3', ':::', 'total'])
+        self.assertEqual(out.getvalue(), '18\n')
+        self.assertEqual(err.getvalue(), '')
+
+    def test_stream(self):
+        out, err = self.run_pipeline(['numbers', '3', ':::', 'scale'])
+        self.assertEqual(out.getvalue(), '0\n2\n4\n')
+
+    def test_lazy(self):
+        cli = runner.Clize.get_cli(self.commands, pipeline_separator=':::')
+        ret = cli('tool', 'numbers', '3', ':::', 'scale')
+        self.assertEqual(self.consumed, [])
+        self.assertEqual(next(ret), 0)
+        self.assertEqual(self.consumed, [0])
+
+    def test_single_stage(self):
+        out, err = self.run_pipeline(['show', '--prefix=x'])
+        self.assertEqual(out.getvalue(), 'xNone\n')
+
+    def test_object(self):
+        out, err = self.run_pipeline(
+            ['numbers', '3', ':::', 'total', ':::', 'show', '--prefix=x'])
+        self.assertEqual(out.getvalue(), 'x3\n')
+
+    def test_disabled(self):
+        out, err = self.crun(self.commands, ['tool', 'show', ':::'])
+        self.assertTrue(err.getvalue().startswith('tool show: Received extra'))
+
+    def test_unknown_command(self):
+        out, err = self.run_pipeline(['numbers', '3', ':::', 'scael'])
+        self.assertEqual(out.getvalue(), '')
+        self.assertEqual(
+            err.getvalue().splitlines()[0],
+            'tool: Unknown command "scael". Did you mean "scale"?')
+        self.assertEqual(self.consumed, [])
+
+    def test_no_pipeline_input(self):
+        out, err = self.run_pipeline(['numbers', '3', ':::', 'numbers', '2'])
+        self.assertEqual(out.getvalue(), '')
+        self.assertEqual(
+            err.getvalue().splitlines()[0],
+            'tool: Command "numbers" cannot receive the output of the'
+            ' previous command')
+        self.assertEqual(self.consumed, [])
+
+    def test_empty_stage(self):
+        for args in (['numbers', '3', ':::'],
+                     ['numbers', '3', ':::', ':::', 'total']):
+            out, err = self.run_pipeline(args)
+            self.assertEqual(
+                err.getvalue().splitlines()[0],
+                'tool: Missing command after ":::"')
+
+    def test_stage_error(self):
+        out, err = self.run_pipeline(['numbers', '3', ':::', 'scale', '--bad'])
+        self.assertIn('tool scale: Unknown option', err.getvalue())
+
+    def test_reset(self):
+        self.run_pipeline(['numbers', '3', ':::', 'total'])
+        self.assertIsNone(parameters._pipeline_value.get())
@@ -0,0 +1,175 @@
+# clize -- A command-line argument parser for Python
+# Copyright (C) 2011-2022 by Yann Kaiser and contributors. See AUTHORS and
+# COPYING for details.
+
+import os
+import pathlib
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+import clize_client
+from clize import runner, serve
+
+
+SERVER = '''
+import os, sys
+from clize import serve
+
+def greet(name, *, shout=False):
+    """Greets someone"""
+    greeting = 'Hello ' + name + ' from ' + os.getcwd()
+    return greeting.upper() if shout else greeting
+
+def env(variable):
+    return os.environ.get(variable, '')
+
+def echo():
+    return sys.stdin.read()
+
+def fail():
+    sys.exit(3)
+
+serve.serve(sys.argv[1], greet, env, echo, fail, name='app',
+            request_timeout=0.2)
+'''
+
+CLIENT = '''
+import sys, clize_client
+status = clize_client.connect(sys.argv[1], sys.argv[2:])
+print('clize' in sys.modules)
+sys.exit(status)
+'''
+
+
+class PrewarmTests(unittest.TestCase):
+    def test_clize(self):
+        def version():
+            raise NotImplementedError
+        def func(arg):
+            raise NotImplementedError
+        cli = runner.Clize.get_cli(func, alt=[version])
+        serve.prewarm(cli)
+        self.assertIn('signature', cli.__dict__)
+        self.assertIn('helper', cli.__dict__)
+        alt_cli = cli.signature.alternate[1].func
+        self.assertIn('signature', alt_cli.__dict__)
+        help_cli = cli.signature.alternate[0].func
+        self.assertIn('signature', help_cli.__dict__)
+
+    def test_dispatcher(self):
+        def first():
+            raise NotImplementedError
+        def second():
+            raise NotImplementedError
+        def third():
+            raise NotImplementedError
+        cli = runner.Clize.get_cli({
+            'first': first,
+            'group': runner.SubcommandDispatcher([second, third]),
+        })
+        serve.prewarm(cli)
+        self.assertIn('signature', cli.__dict__)
+        commands = list(cli.owner.cmds.values())
+        self.assertIn('signature', commands[0].__dict__)
+        group = commands[1]
+        for command in group.owner.cmds.values():
+            self.assertIn('signature', command.__dict__)
+            self.assertIn('helper', command.__dict__)
+
+    def test_not_clize(self):
+        serve.prewarm(object())
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX') and hasattr(os, 'fork'),
+                     'Unix domain sockets and fork are required')
+class ServeTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.path = os.path.join(self.tmp, 'app.sock')
+        self.server = subprocess.Popen(
+            [sys.executable, '-c', SERVER, self.path],
+            cwd=str(pathlib.Path(__file__).parents[2]))
+        self.addCleanup(self.server.wait)
+        self.addCleanup(self.server.terminate)
+        deadline = time.monotonic() + 10
+        while not os.path.exists(self.path):
+            if time.monotonic() > deadline or self.server.poll() is not None:
+                self.fail('Server did not start')
+            time.sleep(0.01)
+
+    def run_client(self, *args, stdin=b'', client=('-m', 'clize_client')):
+        return subprocess.run(
+            [sys.executable] + list(client) + [self.path] + list(args),
+            input=stdin, capture_output=True, cwd=self.tmp,
+            env=dict(os.environ, PYTHONPATH=str(
+                pathlib.Path(__file__).parents[2]), CLIZE_TEST='value'))
+
+    def test_run(self):
+        proc = self.run_client('greet', 'world', '--shout')
+        self.assertEqual(proc.returncode, 0)
+        self.assertEqual(
+            proc.stdout.decode(),
+            'HELLO WORLD FROM ' + os.path.realpath(self.tmp).upper() + '\n')
+
+    def test_environment(self):
+        proc = self.run_client('env', 'CLIZE_TEST')
+        self.assertEqual(proc.stdout, b'value\n')
+
+    def test_stdin(self):
+        proc = self.run_client('echo', stdin=b'from stdin')
+        self.assertEqual(proc.stdout, b'from stdin\n')
+
+    def test_exit_status(self):
+        proc = self.run_client('fail')
+        self.assertEqual(proc.returncode, 3)
+
+    def test_error(self):
+        proc = self.run_client('greet')
+        self.assertEqual(proc.returncode, 2)
+        self.assertTrue(proc.stderr.startswith(b'app greet: '))
+
+    def test_consecutive(self):
+        for name in ['a', 'b', 'c']:
+            proc = self.run_client('greet', name)
+            self.assertTrue(proc.stdout.startswith(b'Hello ' + name.encode()))
+
+    def test_connect(self):
+        read_fd, write_fd = os.pipe()
+        try:
+            status = clize_client.connect(
+                self.path, ['env', 'CLIZE_TEST'], stdout=write_fd)
+        finally:
+            os.close(write_fd)
+        with os.fdopen(read_fd, 'rb') as f:
+            output = f.read()
+        self.assertEqual(status, 0)
+        self.assertEqual(output, b'\n')
+
+    def test_client_without_clize(self):
+        proc = self.run_client('greet', 'world', client=('-c', CLIENT))
+        self.assertEqual(proc.returncode, 0)
+        self.assertTrue(proc.stdout.startswith(b'Hello world'))
+        self.assertEqual(proc.stdout.splitlines()[-1], b'False')
+
+    def test_socket_permissions(self):
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_bad_request(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.path)
+            sock.sendall(b'garbage')
+        proc = self.run_client('env', 'CLIZE_TEST')
+        self.assertEqual(proc.stdout, b'value\n')
+
+    def test_stalled_client(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.path)
+            proc = self.run_client('env', 'CLIZE_TEST')
+            self.assertEqual(proc.stdout, b'value\n')
+            self.assertEqual(sock.recv(1), b'')
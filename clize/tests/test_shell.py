@@ -0,0 +1,168 @@
+# clize -- A command-line argument parser for Python
+# Copyright (C) 2011-2022 by Yann Kaiser and contributors. See AUTHORS and
+# COPYING for details.
+
+from io import StringIO
+
+from clize import runner, parameters, errors
+from clize.shell import Shell, completions
+from clize.tests.util import Tests
+
+
+colors = parameters.mapped([
+    ('red', ('red', 'r'), 'Red'),
+    ('green', ('green',), 'Green'),
+])
+
+
+def add(a: int, b: int, *, negate=False):
+    """Adds numbers"""
+    return -(a + b) if negate else a + b
+
+
+def pick(*, color: colors='red', name=''):
+    """Picks a color"""
+    return color
+
+
+def fail():
+    raise errors.UserError('failed')
+
+
+def stop():
+    raise SystemExit(3)
+
+
+def crash():
+    raise KeyError('missing')
+
+
+class CompletionTests(Tests):
+    def setUp(self):
+        self.cli = runner.Clize.get_cli(
+            [add, pick], shell_names=('shell',), pipeline_separator=':::')
+
+    def test_commands(self):
+        self.assertEqual(
+            sorted(completions(self.cli, [])),
+            ['--help', '--shell', '-h', 'add', 'pick'])
+
+    def test_options(self):
+        self.assertEqual(
+            sorted(completions(self.cli, ['add', '1'])),
+            ['--help', '--negate', '-h'])
+
+    def test_mapped_values(self):
+        self.assertEqual(
+            completions(self.cli, ['pick', '--color']),
+            ['red', 'r', 'green'])
+
+    def test_flag(self):
+        self.assertIn('--negate', completions(self.cli, ['add', '--negate']))
+
+    def test_free_value(self):
+        self.assertEqual(completions(self.cli, ['pick', '--name']), [])
+
+    def test_unknown_command(self):
+        self.assertEqual(completions(self.cli, ['unknown']), [])
+
+    def test_pipeline(self):
+        self.assertIn('pick', completions(self.cli, ['add', '1', '2', ':::']))
+        self.assertIn(
+            '--color', completions(self.cli, ['add', '1', '2', ':::', 'pick']))
+
+    def test_single(self):
+        cli = runner.Clize.get_cli(pick)
+        self.assertEqual(
+            sorted(completions(cli, [])),
+            ['--color', '--help', '--name', '-h'])
+
+    def test_not_clize(self):
+        self.assertEqual(completions(object(), []), [])
+
+
+class ShellTests(Tests):
+    def run_shell(self, lines, commands=(add, pick, fail, stop, crash)):
+        cli = runner.Clize.get_cli(list(commands))
+        out = StringIO()
+        err = StringIO()
+        shell = Shell(cli, 'tool', stdin=StringIO(lines), stdout=out,
+                      stderr=err)
+        shell.cmdloop()
+        return shell, out.getvalue(), err.getvalue()
+
+    def test_commands(self):
+        shell, out, err = self.run_shell(
+            'add 1 2\npick --color r\nadd 1 2 --negate\n')
+        self.assertEqual(out, 'tool> 3\ntool> red\ntool> -3\ntool> \n')
+        self.assertEqual(err, '')
+
+    def test_errors(self):
+        shell, out, err = self.run_shell('add 1\nfail\nstop\nadd "1\nadd 1 1\n')
+        self.assertTrue(out.endswith('tool> 2\ntool> \n'))
+        lines = [line for line in err.splitlines()
+                 if not line.startswith('Usage')]
+        self.assertTrue(lines[0].startswith('tool add: Missing required'))
+        self.assertEqual(lines[1], 'tool fail: failed')
+        self.assertEqual(lines[2], 'tool: No closing quotation')
+
+    def test_exception(self):
+        shell, out, err = self.run_shell('crash\nadd 1 2\n')
+        self.assertTrue(out.endswith('tool> 3\ntool> \n'))
+        self.assertTrue(err.startswith('Traceback'))
+        self.assertIn("KeyError: 'missing'", err)
+
+    def test_interrupt_at_prompt(self):
+        lines = iter(['add 1 2\n', KeyboardInterrupt, 'add 2 3\n', ''])
+        class Input(object):
+            def readline(self):
+                line = next(lines)
+                if line is KeyboardInterrupt:
+                    raise line
+                return line
+        out = StringIO()
+        Shell(runner.Clize.get_cli([add, pick]), 'tool', stdin=Input(),
+              stdout=out, stderr=StringIO()).cmdloop()
+        self.assertEqual(out.getvalue(), 'tool> 3\ntool> \ntool> 5\ntool> \n')
+
+    def test_empty_line(self):
+        shell, out, err = self.run_shell('add 1 2\n\n# comment\n')
+        self.assertEqual(out, 'tool> 3\ntool> tool> tool> \n')
+
+    def test_exit(self):
+        shell, out, err = self.run_shell('exit\nadd 1 2\n')
+        self.assertEqual(out, 'tool> ')
+
+    def test_exit_command(self):
+        def exit():
+            return 'exit command'
+        shell, out, err = self.run_shell('exit\n', [add, exit])
+        self.assertEqual(out, 'tool> exit command\ntool> \n')
+
+    def test_complete(self):
+        cli = runner.Clize.get_cli([add, pick])
+        shell = Shell(cli, 'tool', stdin=StringIO(), stdout=StringIO())
+        self.assertEqual(shell.completenames('a', 'a', 0, 1), ['add'])
+        self.assertEqual(
+            shell.completedefault('--c', 'pick --c', 5, 8), ['--color'])
+        self.assertEqual(
+            shell.completedefault('g', 'pick --color g', 13, 14), ['green'])
+
+    def test_alternate_action(self):
+        stdin = StringIO('add 2 3\n')
+        out, err = self.crun([add, pick], ['tool', '--shell'], stdin=stdin,
+                             shell_names=('shell',))
+        self.assertEqual(out.getvalue(), 'tool> 5\ntool> \n')
+
+    def test_alternate_action_single(self):
+        stdin = StringIO('1 2\n--negate 3 4\n')
+        out, err = self.crun(add, ['tool', '--shell'], stdin=stdin,
+                             shell_names=('shell',))
+        self.assertEqual(out.getvalue(), 'tool> 3\ntool> -7\ntool> \n')
+
+    def test_shell_names_key(self):
+        self.assertNotEqual(
+            runner.Clize(add), runner.Clize(add, shell_names=('shell',)))
+        self.assertEqual(
+            runner.Clize(add, shell_names=('shell',)).parameters()
+            ['shell_names'], ('shell',))
@@ -2,6 +2,8 @@
 # Copyright (C) 2011-2022 by Yann Kaiser and contributors. See AUTHORS and
 # COPYING for details.
 
+import io
+
 from clize import util
 from clize.tests.util import Fixtures
 
@@ -240,3 +242,24 @@ class KeywordNameConversionTests(Fixtures):
     avoiding_name = "list_", "--list"
     private_name = "_name", "--name"
     private_one_letter = "_n", "-n"
+
+
+class SplitStreamTests(Fixtures):
+    def _test(self, data, sep, size, expected):
+        f = io.BytesIO(data)
+        self.assertEqual(expected, list(util.split_stream(f.read, sep, size)))
+
+    empty = b'', b'\n', 4, []
+    trailing_sep = b'ab\ncd\n', b'\n', 4, [b'ab', b'cd']
+    no_trailing_sep = b'ab\ncd', b'\n', 4, [b'ab', b'cd']
+    across_chunks = b'abcdefgh\0ij', b'\0', 3, [b'abcdefgh', b'ij']
+    empty_items = b'a\n\nb\n', b'\n', 1, [b'a', b'', b'b']
+
+
+class ChunkedTests(Fixtures):
+    def _test(self, iterable, size, expected):
+        self.assertEqual(expected, list(util.chunked(iterable, size)))
+
+    empty = [], 2, []
+    exact = range(4), 2, [[0, 1], [2, 3]]
+    remainder = iter(range(5)), 2, [[0, 1], [2, 3], [4]]
@@ -125,6 +125,32 @@ class property_once(object):
         return '<property_once from {0!r}>'.format(self.func)
 
 
+def split_stream(read, sep, size=1 << 16):
+    """Yields the items separated by ``sep`` in the data returned by
+    successive calls to ``read(size)``, without holding more than a chunk and
+    one item in memory at once."""
+    rest = None
+    while True:
+        data = read(size)
+        if not data:
+            break
+        items = (data if rest is None else rest + data).split(sep)
+        rest = items.pop()
+        yield from items
+    if rest:
+        yield rest
+
+
+def chunked(iterable, size):
+    """Yields lists of up to ``size`` consecutive items from ``iterable``"""
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
 def bound(min, val, max):
     if min is not None and val < min:
         return min
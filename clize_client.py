@@ -0,0 +1,80 @@
+# clize -- A command-line argument parser for Python
+# Copyright (C) 2011-2022 by Yann Kaiser and contributors. See AUTHORS and
+# COPYING for details.
+
+"""Client for the servers started with `clize.serve.serve`
+
+This module only uses the standard library and does not import clize, so
+that ``python -m clize_client SOCKET [ARGS...]`` starts as quickly as the
+interpreter allows.
+"""
+
+import array
+import json
+import os
+import socket
+import struct
+import sys
+
+
+_header = struct.Struct('!I')
+_status = struct.Struct('!i')
+_STDIO_FDS = 3
+
+
+def _send_request(sock, request, fds):
+    payload = json.dumps(request).encode('utf-8')
+    data = _header.pack(len(payload)) + payload
+    sent = sock.sendmsg(
+        [data],
+        [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds))])
+    sock.sendall(data[sent:])
+
+
+def _recv_exactly(sock, size, data=b''):
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError('Connection closed')
+        data += chunk
+    return data
+
+
+def connect(path, args=None, stdin=0, stdout=1, stderr=2):
+    """Runs a command in the server listening at ``path``, and returns its
+    exit status.
+
+    :param str path: The socket the server is listening on.
+    :param sequence args: The command-line arguments, without the program
+        name. Defaults to ``sys.argv[1:]``.
+    :param int stdin: File descriptor used as the command's standard input.
+    :param int stdout: File descriptor used as the command's standard output.
+    :param int stderr: File descriptor used as the command's standard error.
+    """
+    if args is None:
+        args = sys.argv[1:]
+    request = {
+        'args': list(args),
+        'cwd': os.getcwd(),
+        'env': dict(os.environ),
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        _send_request(sock, request, [stdin, stdout, stderr])
+        try:
+            status, = _status.unpack(_recv_exactly(sock, _status.size))
+        except EOFError:
+            return 1
+    return status
+
+
+def main():
+    if len(sys.argv) < 2:
+        print('Usage: python -m clize_client SOCKET [ARGS...]',
+              file=sys.stderr)
+        return 2
+    return connect(sys.argv[1], sys.argv[2:])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
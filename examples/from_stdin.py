@@ -0,0 +1,14 @@
+from clize import run, parameters
+
+
+def main(*paths: parameters.from_stdin(sep='\0')):
+    """Counts the lines in the given files
+
+    :param paths: Files to count the lines of.
+    """
+    for path in paths:
+        with open(path, 'rb') as f:
+            print(path, sum(1 for _ in f))
+
+
+run(main)
@@ -38,6 +38,7 @@ setup(
         ],
     },
     packages=('clize', 'clize.tests'),
+    py_modules=('clize_client',),
     test_suite='clize.tests',
     keywords=[
         'CLI', 'options', 'arguments', 'getopts', 'getopt', 'argparse',